@@ -2,6 +2,7 @@ from .graph import Graph
 from .node import Node
 from .schema import Schema, Field
 from .context import Context
+from .columns import Columns
 
 
 __all__ = [
@@ -10,4 +11,5 @@ __all__ = [
     'Schema',
     'Field',
     'Context',
+    'Columns',
 ]
@@ -0,0 +1,83 @@
+"""
+Memory and allocation benchmark for parsed node trees and Path registries.
+
+Usage:
+    python -m pygql.benchmarks.memory [--nodes N] [--paths N]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from pygql.node import Node
+from pygql.path import Path
+
+
+def build_query(n:int):
+    """ A query of `n` aliased siblings, each with one nested leaf child.
+    """
+    selections = ', '.join(
+        'a{0}: user(id: "{0}") {{ id, name, location {{ lat, lng }} }}'.format(i)
+        for i in range(n // 2)
+    )
+    return '{ ' + selections + ' }'
+
+
+def measure(func, repeat:int=1):
+    """ Returns `(result, bytes, blocks, seconds)` allocated by `func`.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    start_blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    return result, size - start_size, blocks - start_blocks, elapsed
+
+
+def bench_clone(n_nodes:int):
+    template = Node.parse(build_query(n_nodes))
+    clone, size, blocks, elapsed = measure(template.clone)
+    count = len(clone.flatten())
+    return {
+        'nodes': count,
+        'bytes_per_node': size / count,
+        'blocks_per_node': blocks / count,
+        'clone_seconds': elapsed,
+    }
+
+
+def bench_registry(n_paths:int):
+    def build():
+        root = Path(name=Path.ROOT_NAME)
+        for i in range(n_paths):
+            path = root.traverse('type{}.field{}'.format(i // 10, i))
+            path.execute = build
+        return root
+    _, size, blocks, elapsed = measure(build)
+    return {
+        'paths': n_paths,
+        'bytes_per_path': size / n_paths,
+        'blocks_per_path': blocks / n_paths,
+        'build_seconds': elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--paths', type=int, default=10000)
+    args = parser.parse_args(argv)
+    print(json.dumps({
+        'clone': bench_clone(args.nodes),
+        'registry': bench_registry(args.paths),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Instantiation benchmark for a Schema with many fields.
+
+Usage:
+    python -m pygql.benchmarks.schema [--fields N] [--number N]
+"""
+import argparse
+import json
+import timeit
+
+from pygql.schema import Field, Schema
+
+
+def build_schema(n_fields:int):
+    """ A Schema class with `n_fields` fields, a fifth of them nested and a
+        third of them restricted to roles.
+    """
+    attrs = {}
+    for i in range(n_fields):
+        roles = ['staff'] if i % 3 == 0 else None
+        attrs['field{}'.format(i)] = Field(
+            'public_field{}'.format(i), nested=(i % 5 == 0), roles=roles
+        )
+    return type('BenchmarkSchema', (Schema, ), attrs)
+
+
+def bench_instantiate(n_fields:int, number:int):
+    schema_class = build_schema(n_fields)
+
+    def before():
+        # the field maps used to be built by each instance
+        schema = schema_class()
+        schema_class._build_fields()
+        return schema
+
+    results = {}
+    for name, func in (('before', before), ('after', schema_class)):
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = {
+            'usec_per_instance': seconds / number * 1e6,
+            'ops_per_second': number / seconds,
+        }
+    results['speedup'] = (
+        results['before']['usec_per_instance'] /
+        results['after']['usec_per_instance']
+    )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--fields', type=int, default=50)
+    parser.add_argument('--number', type=int, default=10000)
+    args = parser.parse_args(argv)
+    print(json.dumps({
+        'fields': args.fields,
+        'instantiate': bench_instantiate(args.fields, args.number),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
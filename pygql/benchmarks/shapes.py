@@ -0,0 +1,177 @@
+"""
+Synthetic path registries for `pygql.benchmarks.suite`, one graph per
+query shape. Registries are fixed at import; the size of each shape is set
+by the query built for it.
+"""
+from pygql import Graph, Schema, Field, Context
+
+
+DEPTH = 50           # nested levels registered for the deep shape
+REDIRECTS = 5        # length of the redirect chain
+FIELDS = 100         # fields of the schema-heavy shape
+
+
+wide_graph = Graph()
+deep_graph = Graph()
+list_graph = Graph()
+redirect_graph = Graph()
+schema_graph = Graph()
+
+
+#
+# wide: many aliased siblings, each with a Context
+#
+
+class ItemSchema(Schema):
+    id = Field('id')
+    name = Field('name')
+    value = Field('item_value')
+
+
+class ItemContext(Context):
+    def __init__(self, request, node):
+        self.schema = ItemSchema()
+
+    def authorize(self, request, node):
+        return self.schema
+
+
+@wide_graph(path='item', context=ItemContext)
+def item(request, node):
+    return {'id': node.args['id'], 'name': 'item', 'item_value': 1}
+
+
+def wide_query(width:int=500):
+    return '{ ' + ', '.join(
+        'a{0}: item(id: "{0}") {{ id, name, value }}'.format(i)
+        for i in range(width)
+    ) + ' }'
+
+
+#
+# deep: a single chain of nested paths
+#
+
+@deep_graph(path=['.'.join(['level'] * (i + 1)) for i in range(DEPTH)])
+def level(request, node):
+    return {'id': 1}
+
+
+def deep_query(depth:int=DEPTH):
+    return '{ ' + 'level { id, ' * depth + 'id' + ' }' * depth + ' }'
+
+
+#
+# list-heavy: a yielding path whose child returns a column of rows, merged
+# by position as in `pygql.examples.arrays`
+#
+
+@list_graph(path='user')
+def user(request, node):
+    return {'id': 'u1', 'name': 'Einstein'}
+
+
+@list_graph(path='user.photos', yields=True)
+def user_photos(request, node):
+    rows = int(node.args.get('rows', 1000))
+    ids = list(range(rows))
+    yield {'ids': ids}
+
+    photos = [{'id': i, 'url': 'http://example.com/1.jpg'} for i in ids]
+    for key, child in node.children.items():
+        for photo, value in zip(photos, child.result):
+            photo[key] = value
+    yield photos
+
+
+@list_graph(path='user.photos.location')
+def photo_locations(request, node):
+    return [{'lng': i % 180, 'lat': -27} for i in node.parent.state['ids']]
+
+
+def list_query(rows:int=100000):
+    return '''{{
+        user {{ name, photos(rows: "{}") {{ url, location {{ lng, lat }} }} }}
+    }}'''.format(rows)
+
+
+#
+# redirect-chained: project.assignee -> r1 -> ... -> user
+#
+
+@redirect_graph(path='project')
+def project(request, node):
+    return {'status': 'draft'}
+
+
+@redirect_graph(path='user')
+def redirect_user(request, node):
+    return {'name': 'Kant'}
+
+
+@redirect_graph(path='user.location')
+def redirect_user_location(request, node):
+    return {'lng': 180, 'lat': -81}
+
+
+def _make_link(i):
+    def link(request, node):
+        node.args['hop'] = i
+    link.__name__ = 'link{}'.format(i)
+    return link
+
+
+def _register_chain():
+    names = ['project.assignee'] + [
+        'r{}'.format(i) for i in range(1, REDIRECTS)
+    ] + ['user']
+    for i, (name, target) in enumerate(zip(names, names[1:])):
+        globals()['link{}'.format(i)] = redirect_graph(
+            path=name, redirect=target
+        )(_make_link(i))
+
+
+_register_chain()
+
+
+def redirect_query(width:int=100):
+    return '{ ' + ', '.join(
+        'p{0}: project(id: "{0}") {{ assignee {{ name, location {{ lng }} }} }}'
+        .format(i) for i in range(width)
+    ) + ' }'
+
+
+#
+# schema-heavy: wide schemas with renamed and role-restricted fields
+#
+
+RecordSchema = type('RecordSchema', (Schema, ), {
+    'field{}'.format(i): Field(
+        'internal_field{}'.format(i),
+        roles=(['staff'] if i % 2 else None),
+    )
+    for i in range(FIELDS)
+})
+
+RECORD = {'internal_field{}'.format(i): i for i in range(FIELDS)}
+
+
+class RecordContext(Context):
+    def __init__(self, request, node):
+        self.schema = RecordSchema(default_role='staff')
+
+    def authorize(self, request, node):
+        return self.schema
+
+
+@schema_graph(path='record', context=RecordContext)
+def record(request, node):
+    return dict(RECORD)
+
+
+def schema_query(width:int=100):
+    fields = ', '.join('field{}'.format(i) for i in range(FIELDS))
+    return '{ ' + ', '.join(
+        'r{0}: record(id: "{0}") {{ {1} }}'.format(i, fields)
+        for i in range(width)
+    ) + ' }'
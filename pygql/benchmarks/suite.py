@@ -0,0 +1,182 @@
+"""
+Benchmark suite over the synthetic registries in `pygql.benchmarks.shapes`.
+
+For each query shape, the parse, compile and bind stages (Context,
+`authorize` and `_validate`), path execution and result processing
+(`_process_result` and `Schema.dump`) are timed separately, along with
+whole executions per second and their peak memory. Results are written as
+JSON; pass the output of a previous run as `--baseline` to report the
+ratio of each timing to it.
+
+Usage:
+    python -m pygql.benchmarks.suite [--output FILE] [--baseline FILE]
+        [--shapes wide,deep,...] [--repeat N] [--rows N]
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from collections import defaultdict
+
+from mock import MagicMock
+
+from pygql.benchmarks import shapes
+from pygql.node import Node
+from pygql.plan import Execution, Plan
+from pygql.tracing import (
+    Hooks,
+    PHASE_AUTHORIZE,
+    PHASE_CONTEXT,
+    PHASE_EXECUTE,
+    PHASE_RESULT,
+    PHASE_STATE,
+    PHASE_VALIDATE,
+)
+
+
+# stage reported for each traced phase
+STAGES = {
+    PHASE_CONTEXT: 'bind',
+    PHASE_AUTHORIZE: 'bind',
+    PHASE_VALIDATE: 'bind',
+    PHASE_STATE: 'execute',
+    PHASE_EXECUTE: 'execute',
+    PHASE_RESULT: 'result',
+}
+
+
+def get_shapes(rows:int):
+    return {
+        'wide': (shapes.wide_graph, shapes.wide_query(500)),
+        'deep': (shapes.deep_graph, shapes.deep_query(shapes.DEPTH)),
+        'list': (shapes.list_graph, shapes.list_query(rows)),
+        'redirect': (shapes.redirect_graph, shapes.redirect_query(100)),
+        'schema': (shapes.schema_graph, shapes.schema_query(100)),
+    }
+
+
+def best_of(func, repeat:int):
+    """ Returns the shortest of `repeat` timings of `func`, in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def time_stages(graph, template, plan, repeat:int):
+    """ Time the traced phases of `repeat` executions, keeping the fastest
+        execution of each stage.
+    """
+    totals = defaultdict(list)
+    for _ in range(repeat):
+        stages = defaultdict(float)
+        hooks = Hooks()
+        hooks.end.append(lambda span: stages.__setitem__(
+            STAGES[span.phase], stages[STAGES[span.phase]] + span.duration
+        ))
+        nodes = template.clone().flatten()
+        Execution(plan, MagicMock(), nodes, hooks=hooks).run()
+        for stage, seconds in stages.items():
+            totals[stage].append(seconds)
+    return {stage: min(seconds) for stage, seconds in totals.items()}
+
+
+def peak_memory(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_shape(graph, query:str, repeat:int):
+    graph.scan(shapes)
+    request = MagicMock()
+    template = Node._parse(query, graph.limits)
+    plan = Plan.compile(template, graph.root)
+
+    stages = {
+        'parse': best_of(lambda: Node._parse(query, graph.limits), repeat),
+        'compile': best_of(lambda: Plan.compile(template, graph.root), repeat),
+        'bind': 0.0,
+        'execute': 0.0,
+        'result': 0.0,
+    }
+    stages.update(time_stages(graph, template, plan, repeat))
+
+    # whole executions, with the query already in the parse cache
+    graph.execute(request, query)
+    total = best_of(lambda: graph.execute(request, query), repeat)
+
+    return {
+        'nodes': len(template.flatten()),
+        'stages_ms': {k: v * 1e3 for k, v in stages.items()},
+        'execute_ms': total * 1e3,
+        'ops_per_second': 1 / total,
+        'peak_bytes': peak_memory(lambda: graph.execute(request, query)),
+    }
+
+
+def compare(results:dict, baseline:dict):
+    """ Ratio of each stage timing to the baseline, and of the whole
+        execution under 'total'; above 1 is slower.
+    """
+    changes = {}
+    for name, result in results.items():
+        base = baseline.get('shapes', {}).get(name)
+        if base is None:
+            continue
+        changes[name] = {
+            stage: ms / base['stages_ms'][stage]
+            for stage, ms in result['stages_ms'].items()
+            if base['stages_ms'].get(stage)
+        }
+        changes[name]['total'] = result['execute_ms'] / base['execute_ms']
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--output', help='JSON file to write results to')
+    parser.add_argument('--baseline', help='results of a previous run')
+    parser.add_argument('--shapes', help='comma-separated shapes to run')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    all_shapes = get_shapes(args.rows)
+    names = args.shapes.split(',') if args.shapes else list(all_shapes)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'shapes': {
+            name: bench_shape(*all_shapes[name], repeat=args.repeat)
+            for name in names
+        },
+    }
+    if args.baseline:
+        with open(args.baseline) as fp:
+            report['change'] = compare(report['shapes'], json.load(fp))
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import time
+
+from collections import OrderedDict
+from threading import Lock
+
+
+__all__ = ['LRUCache', 'TTLCache']
+
+
+class LRUCache(object):
+    """
+    A bounded, thread-safe mapping that evicts its least recently used entry
+    once `maxsize` entries are stored. Hit, miss and eviction counters are
+    kept so that the cache can be sized against real traffic. A `maxsize` of
+    zero disables caching altogether.
+    """
+
+    def __init__(self, maxsize:int=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, predicate):
+        """ Remove every entry whose key satisfies `predicate`. Returns the
+            number of entries removed.
+        """
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class TTLCache(LRUCache):
+    """
+    An `LRUCache` whose entries also expire `ttl` seconds after they are set.
+    Expired entries count as misses.
+    """
+
+    def __init__(self, maxsize:int=256, ttl:float=60.0, timer=time.monotonic):
+        super(TTLCache, self).__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+        self._timer = timer
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._timer()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._timer():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        super(TTLCache, self).set(key, (self._timer() + self.ttl, value))
+
+    @property
+    def stats(self):
+        stats = super(TTLCache, self).stats
+        stats['expirations'] = self.expirations
+        return stats
@@ -0,0 +1,91 @@
+__all__ = ['Columns', 'json_default']
+
+
+class Columns(object):
+    """
+    Columnar alternative to returning a list of dicts from a path function.
+    It maps field names to equal-length column sequences, such as lists,
+    `array.array` or NumPy arrays. Schema dumps rename columns rather than
+    rows, and list results of child nodes are attached as new columns, so
+    rows are only materialized when the result is serialized.
+    """
+
+    def __init__(self, columns:dict=None, **kwargs):
+        self._columns = {}
+        self._length = None
+        for name, column in dict(columns or {}, **kwargs).items():
+            self[name] = column
+
+    def __len__(self):
+        return self._length or 0
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __setitem__(self, name, column):
+        if self._length is None:
+            self._length = len(column)
+        elif len(column) != self._length:
+            raise ValueError(
+                'column {} has {} rows; expected {}'.format(
+                    name, len(column), self._length))
+        self._columns[name] = column
+
+    def __delitem__(self, name):
+        del self._columns[name]
+
+    def __eq__(self, other):
+        if isinstance(other, Columns):
+            other = other.to_list()
+        return self.to_list() == other
+
+    def __repr__(self):
+        return 'Columns<{}>'.format(', '.join(self._columns))
+
+    def keys(self):
+        return self._columns.keys()
+
+    def items(self):
+        return self._columns.items()
+
+    def rename(self, names:dict):
+        """ Return a copy with every column renamed through `names`.
+        """
+        return Columns({names[k]: v for k, v in self._columns.items()})
+
+    def rows(self):
+        """ Generate the rows as dicts.
+        """
+        names = list(self._columns)
+        columns = [_to_list(c) for c in self._columns.values()]
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+
+    def to_list(self):
+        return list(self.rows())
+
+
+def _to_list(column):
+    if isinstance(column, Columns):
+        return column.to_list()
+    if hasattr(column, 'tolist'):
+        # array.array and numpy arrays convert to Python scalars at once
+        return column.tolist()
+    return column
+
+
+def json_default(obj):
+    """ `default` function for `json.dumps` that serializes `Columns` as
+        a list of row objects.
+    """
+    if isinstance(obj, Columns):
+        return obj.to_list()
+    raise TypeError(
+        'Object of type {} is not JSON serializable'.format(
+            type(obj).__name__))
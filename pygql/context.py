@@ -11,3 +11,13 @@ class Context(object):
     @abc.abstractmethod
     def authorize(self, request, node):
         pass
+
+    @classmethod
+    def cache_key(cls, request, node):
+        """
+        Return a hashable key, such as the principal of the request, to
+        reuse the Context and the Schema returned by `authorize` for every
+        node of this class with the same key in a request. The default,
+        None, creates and authorizes a Context for each node.
+        """
+        return None
@@ -0,0 +1,93 @@
+import time
+
+from threading import Lock
+
+from pygql.cache import LRUCache
+
+
+__all__ = ['estimate_cost', 'TokenBucket']
+
+
+def estimate_cost(plan, nodes:list):
+    """
+    Estimate the cost of executing `plan` against `nodes` from the `cost`
+    and `fanout` declared on each path with `@graph`. The cost of a subtree
+    is the cost of its own path functions plus its fanout times the cost of
+    its child subtrees, so that the children of list paths count once per
+    expected row. Plans whose paths only declare constant costs are only
+    estimated once.
+    """
+    if plan.static_cost is not None:
+        return plan.static_cost
+
+    is_static = True
+    totals = {}
+    stack = [(plan.frame, False)]
+    while stack:
+        frame, is_expanded = stack.pop()
+        if not is_expanded:
+            stack.append((frame, True))
+            stack.extend((child, False) for child in frame.children)
+            continue
+        children_cost = sum(totals.pop(child.node) for child in frame.children)
+        if frame.node == 0:
+            totals[frame.node] = children_cost
+            continue
+        node = nodes[frame.node]
+        # redirected nodes execute the paths they redirect to
+        paths = [step.path for step in frame.steps] or [frame.path]
+        cost = 0
+        for path in paths:
+            if callable(path.cost):
+                is_static = False
+                cost += path.cost(node)
+            else:
+                cost += path.cost
+        fanout = paths[-1].fanout
+        if callable(fanout):
+            is_static = False
+            fanout = fanout(node)
+        totals[frame.node] = cost + fanout * children_cost
+
+    total = totals[plan.frame.node]
+    if is_static:
+        plan.static_cost = total
+    return total
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket rate limiter, keyed by request. Each key may
+    spend up to `capacity` tokens at once, refilled at `rate` tokens per
+    second. `key` is a function of the request, e.g. returning the user or
+    client address; buckets of the least recently seen keys are discarded
+    beyond `maxsize`.
+    """
+
+    def __init__(self, rate:float, capacity:float, key=None,
+                 maxsize:int=10000, timer=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.key = key or (lambda request: None)
+        self._buckets = LRUCache(maxsize)
+        self._timer = timer
+        self._lock = Lock()
+
+    def acquire(self, request, cost:float=1):
+        """ Take `cost` tokens from the bucket of the request's key, if it
+            holds enough. Returns True if the tokens were taken.
+        """
+        key = self.key(request)
+        now = self._timer()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = self.capacity
+            else:
+                tokens, last = bucket
+                tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            is_allowed = cost <= tokens
+            if is_allowed:
+                tokens -= cost
+            self._buckets.set(key, (tokens, now))
+            return is_allowed
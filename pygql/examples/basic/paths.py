@@ -35,6 +35,11 @@ class LocationContext(Context):
     def __init__(self, request, node):
         self.schema = LocationSchema()
 
+    @classmethod
+    def cache_key(cls, request, node):
+        # the same schema applies to all locations in a request
+        return True
+
     def authorize(self, request, node):
         return self.schema
 
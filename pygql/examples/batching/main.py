@@ -0,0 +1,22 @@
+from pprint import pprint
+
+from mock import MagicMock
+
+from . import graph, paths
+
+
+# register the functions annotated with @graph decorator
+graph.scan(paths)
+
+# mock the HTTP request
+request = MagicMock()
+
+pprint(graph.execute(request, '''
+    {
+        jim: user(id: "789") { name },
+        company { name },
+        bob: user(id: "145") { id, name }
+    }'''))
+
+# both aliases were fetched in a single call
+print(paths.QUERIES)
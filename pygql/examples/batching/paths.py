@@ -0,0 +1,26 @@
+from . import graph
+
+
+USERS = {
+    '789': {'id': '789', 'name': 'Jim'},
+    '145': {'id': '145', 'name': 'Bob'},
+}
+
+# backend round-trips made so far
+QUERIES = []
+
+
+@graph(path='user', batch=True)
+def users(request, nodes):
+    # one round-trip for every aliased `user` node in the selection
+    ids = [node.args.get('id') for node in nodes]
+    QUERIES.append(ids)
+    return [
+        {k: USERS[i][k] for k in node.fields}
+        for i, node in zip(ids, nodes)
+    ]
+
+
+@graph(path='company')
+def company(request, node):
+    return {'name': 'Generic Company'}
@@ -0,0 +1,28 @@
+import json
+
+from mock import MagicMock
+
+from pygql.columns import json_default
+
+from . import graph, paths
+
+
+# register the functions annotated with @graph decorator
+graph.scan(paths)
+
+# mock the HTTP request
+request = MagicMock()
+
+result = graph.execute(request, '''
+    {
+        user(id: "ABC123") {
+            name,
+            photos {
+                id, url,
+                location {lng, lat}
+            }
+        }
+    }''')
+
+# rows are only materialized here
+print(json.dumps(result, default=json_default, indent=2))
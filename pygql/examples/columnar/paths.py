@@ -0,0 +1,44 @@
+from array import array
+
+from pygql import Columns, Context, Field, Schema
+
+from . import graph
+
+
+PHOTO_IDS = ['id1', 'id2', 'id3']
+LNG = array('d', [130, 132, 138])
+LAT = array('d', [-27, -17, -23])
+
+
+class PhotoSchema(Schema):
+    id = Field('photo_id')
+    url = Field('url')
+    location = Field('location', nested=True)
+
+
+class PhotoContext(Context):
+    def __init__(self, request, node):
+        self.schema = PhotoSchema()
+
+    def authorize(self, request, node):
+        return self.schema
+
+
+@graph(path='user')
+def user(request, node):
+    return {'name': 'Einstein'}
+
+
+@graph(path='user.photos', context=PhotoContext)
+def user_photos(request, node):
+    # no dict is allocated per row; the schema renames whole columns
+    return Columns(
+        photo_id=PHOTO_IDS,
+        url=['http://example.com/{}.jpg'.format(i) for i in PHOTO_IDS],
+    )
+
+
+@graph(path='user.photos.location')
+def photo_locations(request, node):
+    # attached to the parent's rows as a column
+    return Columns(lng=LNG, lat=LAT)
@@ -0,0 +1,5 @@
+from pygql import Graph
+
+
+# Global registry of valid paths through the graph
+graph = Graph()
@@ -0,0 +1,23 @@
+import asyncio
+
+from pprint import pprint
+
+from mock import MagicMock
+
+from . import graph, paths
+
+
+# register the functions annotated with @graph decorator
+graph.scan(paths)
+
+# mock the HTTP request
+request = MagicMock()
+
+# the three top-level fields run concurrently, so this takes about as long
+# as the slowest branch rather than the sum of all of them.
+pprint(asyncio.run(graph.execute_async(request, '''
+    {
+        a: user(id: "1") { name, friends { id, location { city } } },
+        b: user(id: "2") { name },
+        company { name }
+    }''')))
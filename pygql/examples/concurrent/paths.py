@@ -0,0 +1,38 @@
+import asyncio
+
+from . import graph
+
+
+# simulated round-trip time of a database or HTTP call
+LATENCY = 0.1
+
+
+@graph(path='user')
+async def user(request, node):
+    await asyncio.sleep(LATENCY)
+    return {'id': node.args.get('id'), 'name': 'Hypatia'}
+
+
+@graph(path='user.friends', yields=True)
+async def user_friends(request, node):
+    # state is available to child nodes before they execute
+    yield {'ids': ['f1', 'f2']}
+
+    await asyncio.sleep(LATENCY)
+    friends = [{'id': i} for i in node.state['ids']]
+    for key, child in node.children.items():
+        for friend, value in zip(friends, child.result):
+            friend[key] = value
+    yield friends
+
+
+@graph(path='user.friends.location')
+async def friend_locations(request, node):
+    await asyncio.sleep(LATENCY)
+    return [{'city': 'Alexandria'} for _ in node.parent.state['ids']]
+
+
+@graph(path='company')
+def company(request, node):
+    # synchronous path functions can be mixed with async ones
+    return {'name': 'Library of Alexandria'}
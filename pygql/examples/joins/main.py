@@ -0,0 +1,24 @@
+from pprint import pprint
+
+from mock import MagicMock
+
+from . import graph, paths
+
+
+# register the functions annotated with @graph decorator
+graph.scan(paths)
+
+# mock the HTTP request
+request = MagicMock()
+
+pprint(graph.execute(request, '''
+    {
+        user(id: "ABC123") {
+            name,
+            photos {
+                id, url,
+                place { name },
+                tags { tag }
+            }
+        }
+    }'''))
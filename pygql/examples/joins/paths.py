@@ -0,0 +1,50 @@
+from . import graph
+
+
+PHOTOS = [
+    {'id': 'id1', 'url': 'http://example.com/1.jpg', 'place_id': 'p1'},
+    {'id': 'id2', 'url': 'http://example.com/2.jpg', 'place_id': 'p2'},
+    {'id': 'id3', 'url': 'http://example.com/3.jpg', 'place_id': 'p1'},
+]
+
+PLACES = [
+    {'id': 'p1', 'name': 'Bern'},
+    {'id': 'p2', 'name': 'Zurich'},
+]
+
+TAGS = [
+    {'photo_id': 'id1', 'tag': 'eating'},
+    {'photo_id': 'id1', 'tag': 'lunch'},
+    {'photo_id': 'id3', 'tag': 'thinking'},
+]
+
+
+@graph(path='user')
+def user(request, node):
+    return {'name': 'Einstein'}
+
+
+@graph(path='user.photos', yields=True)
+def user_photos(request, node):
+    photos = [dict(photo) for photo in PHOTOS]
+    # pass keys to child nodes, which access them via node.parent.state
+    yield {
+        'ids': [photo['id'] for photo in photos],
+        'place_ids': {photo['place_id'] for photo in photos},
+    }
+    # child results are joined into these rows by the executor
+    yield photos
+
+
+@graph(path='user.photos.place', join_on=('place_id', 'id'))
+def photo_places(request, node):
+    # many photos to one place
+    place_ids = node.parent.state['place_ids']
+    return [place for place in PLACES if place['id'] in place_ids]
+
+
+@graph(path='user.photos.tags', join_on=('id', 'photo_id'), join_many=True)
+def photo_tags(request, node):
+    # one photo to many tags
+    ids = set(node.parent.state['ids'])
+    return [tag for tag in TAGS if tag['photo_id'] in ids]
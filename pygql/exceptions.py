@@ -56,7 +56,7 @@ class FieldAmbiguityError(PyGQL_Exception):
     }
 
     def __init__(self, node, field_name):
-        super(FieldValidationError, self).__init__({
+        super(FieldAmbiguityError, self).__init__({
             'data': {
                 'field': field_name,
                 'name': node.name,
@@ -81,6 +81,23 @@ class InvalidResult(PyGQL_Exception):
         })
 
 
+class InvalidBatchResult(PyGQL_Exception):
+    code = 4
+    default_payload = {
+        'message': 'batch path function must return a list '
+                   'with one result per node'
+    }
+
+    def __init__(self, path:str, expected:int, result):
+        super(InvalidBatchResult, self).__init__({
+            'data': {
+                'path': path,
+                'expected': expected,
+                'type': type(result).__name__,
+            }
+        })
+
+
 class NotFound(PyGQL_Exception):
     code = 4
     default_payload = {
@@ -93,3 +110,103 @@ class NotFound(PyGQL_Exception):
                 'path': path,
             }
         })
+
+
+class UnknownQuery(PyGQL_Exception):
+    code = 5
+    default_payload = {
+        'message': 'persisted query not registered'
+    }
+
+    def __init__(self, query_id:str):
+        super(UnknownQuery, self).__init__({
+            'data': {
+                'query_id': query_id,
+            }
+        })
+
+
+class QueryLimitExceeded(PyGQL_Exception):
+    code = 6
+    default_payload = {
+        'message': 'query exceeds a configured size limit'
+    }
+
+    def __init__(self, limit:str, value:int):
+        super(QueryLimitExceeded, self).__init__({
+            'data': {
+                'limit': limit,
+                'value': value,
+            }
+        })
+
+
+class QueryCostExceeded(PyGQL_Exception):
+    code = 7
+    default_payload = {
+        'message': 'estimated query cost exceeds the budget'
+    }
+
+    def __init__(self, cost, budget):
+        super(QueryCostExceeded, self).__init__({
+            'data': {
+                'cost': cost,
+                'budget': budget,
+            }
+        })
+
+
+class RateLimited(PyGQL_Exception):
+    code = 8
+    default_payload = {
+        'message': 'query cost rate limit exceeded'
+    }
+
+    def __init__(self, cost):
+        super(RateLimited, self).__init__({
+            'data': {
+                'cost': cost,
+            }
+        })
+
+
+class MissingVariable(PyGQL_Exception):
+    code = 9
+    default_payload = {
+        'message': 'required query variable not provided'
+    }
+
+    def __init__(self, name):
+        super(MissingVariable, self).__init__({
+            'data': {
+                'variable': name,
+            }
+        })
+
+
+class InvalidFragment(PyGQL_Exception):
+    code = 10
+    default_payload = {
+        'message': 'unknown or cyclic fragment spread'
+    }
+
+    def __init__(self, name):
+        super(InvalidFragment, self).__init__({
+            'data': {
+                'fragment': name,
+            }
+        })
+
+
+class RedirectCycle(PyGQL_Exception):
+    code = 11
+    default_payload = {
+        'message': 'cyclic chain of redirect paths'
+    }
+
+    def __init__(self, names:list):
+        super(RedirectCycle, self).__init__({
+            'data': {
+                'paths': list(names),
+            }
+        })
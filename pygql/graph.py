@@ -1,18 +1,60 @@
+import hashlib
+import json
+
 import venusian
+from pygql.cache import LRUCache
+from pygql.exceptions import UnknownQuery
 from pygql.schema import Schema
+from pygql.serialize import write_json
 from pygql.context import Context
-from pygql.node import Node
+from pygql.node import Limits, Node
 from pygql.path import Path
+from pygql.plan import Query, invalidate
+from pygql.tracing import Hooks
 
 __all__ = ['Graph']
 
 
-def Graph():
+def Graph(parse_cache_size:int=256,
+          executor=None,
+          max_depth:int=None,
+          max_nodes:int=None,
+          max_aliases:int=None,
+          max_cost:float=None,
+          limiter=None):
     """
     This is a path registry/decorator factory. This is a factory so that
     multiple "graphs" can be used simultaneously rather than a single global
     one.
+
+    Args:
+        - `parse_cache_size`: Maximum number of distinct query strings whose
+            parsed node trees are cached, and of combined queries cached by
+            `execute_batch`. Set to 0 to disable the caches.
+        - `executor`: Optional `concurrent.futures.Executor`, such as a
+            `ThreadPoolExecutor`. If given, sibling subtrees of a query are
+            executed on its workers, which suits path functions that block
+            on I/O.
+        - `max_depth`: Maximum nesting depth of a query.
+        - `max_nodes`: Maximum total number of selections in a query,
+            fields included.
+        - `max_aliases`: Maximum number of aliased selections in any one
+            selection set of a query.
+
+        - `max_cost`: Budget for the estimated cost of a query. See the
+            `cost` and `fanout` arguments of `@graph`.
+        - `limiter`: Optional rate limiter, such as a
+            `pygql.cost.TokenBucket`, whose `acquire(request, cost)` method
+            returns False to reject a query.
+
+    Queries that exceed a limit raise `QueryLimitExceeded` while they are
+    parsed, and those over budget raise `QueryCostExceeded` or
+    `RateLimited`, before any path function or Context runs.
     """
+    _executor = executor
+    _limits = Limits(max_depth, max_nodes, max_aliases)
+    _max_cost, _limiter = max_cost, limiter
+
     class graph(object):
         """
         Graph traversal/path registration decorator.
@@ -21,21 +63,91 @@ def Graph():
         # a tree. It is the entry point to every defined path in the graph.
         root = Path(name=Path.ROOT_NAME)
 
+        # LRU cache of parsed query templates, keyed by query string.
+        # See `parse_cache.stats` for hit, miss and eviction counts.
+        parse_cache = LRUCache(parse_cache_size)
+
+        # LRU cache of the combined query templates of `execute_batch`,
+        # keyed by the query strings they were built from.
+        batch_cache = LRUCache(parse_cache_size)
+
+        # Incremented whenever `scan` changes the registry, invalidating
+        # the execution plans compiled for cached queries.
+        registry_version = 0
+
+        # Persisted queries, mapping query ID to pygql.plan.Query.
+        # See `register_query`.
+        persisted_queries = {}
+
+        # Executor for sibling subtrees. See `Plan.execute_concurrent`.
+        executor = _executor
+
+        # Bounds on the size of queries. See `pygql.node.Limits`.
+        limits = _limits
+
+        # Admission control. See `pygql.cost`.
+        max_cost = _max_cost
+        limiter = _limiter
+
+        # Tracing callbacks, or None if there are none. See `pygql.tracing`.
+        hooks = None
+
         def __init__(self,
                      path:object=None,
                      context:Context=None,
                      yields:bool=False,
-                     redirect:str=None):
+                     redirect:str=None,
+                     batch:bool=False,
+                     memoize:bool=False,
+                     cache:LRUCache=None,
+                     cache_key=None,
+                     join_on=None,
+                     join_many:bool=False,
+                     cost=1,
+                     fanout=1):
             """
             Args:
                 - `path`: A dotted path string or list of strings
                 - `context`: Subclass of pygql.Context
                 - `yields`: Indicates that the wrapped function is a generator
-                    which yields state to its child functions.
+                    which yields state to its child functions. Under
+                    `execute_async`, it may also be an async generator.
                 - `redirect`: This is a dotted path to an existing
                     Path instance. If defined, the return value of the wrapped
                     function will be ignored. It and all relative child nodes
                     will now execute as though the redirect path was queried.
+                - `batch`: Indicates that the wrapped function takes a list
+                    of nodes in place of a single node and returns a list with
+                    one result per node. Sibling nodes that query the same
+                    path, e.g. through aliases, are executed in one call.
+                - `memoize`: Indicates that the wrapped function has no side
+                    effects, so that within a request, a subtree with the same
+                    args, fields and children as one already executed (e.g.
+                    through aliases or redirects) reuses a copy of its result.
+                - `cache`: A `pygql.cache.TTLCache` (or `LRUCache`) that holds
+                    the results of the wrapped function across requests, keyed
+                    like `memoize`. Subtrees found in the cache are not
+                    executed at all, and receive a copy of the cached result.
+                    See `graph.invalidate`.
+                - `cache_key`: Optional function of `(request, node)` whose
+                    hashable return value is added to the cache key, e.g. to
+                    keep results apart by the role of the caller.
+                - `join_on`: Field name, or `(parent_field, child_field)`
+                    pair, on which the list returned by the wrapped function
+                    is joined into the rows returned by its parent. Each
+                    parent row receives the child row with the same key, or
+                    None, so the parent need not merge them by position.
+                    Both functions must return the key fields whether or
+                    not they are selected; unselected keys are removed from
+                    the response once the rows are joined.
+                - `join_many`: Used with `join_on`. Each parent row receives
+                    the list of all child rows with the same key instead.
+                - `cost`: Estimated cost of the wrapped function, either a
+                    number or a function of the node. See `Graph(max_cost=)`.
+                - `fanout`: Factor by which the cost of child nodes is
+                    multiplied, e.g. the expected number of rows of a list
+                    path. A number or a function of the node, such as
+                    `lambda node: int(node.args.get('first', 10))`.
 
             """
             dotted_paths = set()
@@ -46,6 +158,7 @@ def Graph():
                     dotted_paths.add(dotted_path)
 
             assert dotted_paths
+            assert not (batch and (yields or redirect))
             assert not [x for x in dotted_paths if not isinstance(x, str)]
 
             # initialize each path in global tree. `self.root['a', 'b']`yields
@@ -53,12 +166,20 @@ def Graph():
             # element of `a.children`.
             self._paths = []
             for dotted_path in dotted_paths:
-                path = self.root.traverse(dotted_path)
+                path = self.root.traverse(dotted_path, create=True)
                 path.redirect = redirect
                 path.root = self.root
                 path.name = dotted_path
                 path.context_class = context
                 path.yields = yields
+                path.batch = batch
+                path.memoize = memoize
+                path.cache = cache
+                path.cache_key = cache_key
+                path.join_on = join_on
+                path.join_many = join_many
+                path.cost = cost
+                path.fanout = fanout
                 self._paths.append(path)
 
         def __call__(self, func):
@@ -77,15 +198,188 @@ def Graph():
             return func
 
         @classmethod
-        def execute(cls, request, query:str):
-            return Node.execute(request, query, cls)
+        def execute(cls, request, query:str, stats:dict=None,
+                    variables:dict=None):
+            """
+            Execute a query. `variables` are the values of the `$variables`
+            it uses, so that the text of the query, and thus its cached
+            parse and plan, is the same for every request. If a `stats`
+            dict is given, per-request counters are stored in it:
+            `context_hits` and `context_misses` count the Contexts reused
+            and created. See `pygql.context.Context.cache_key`.
+            """
+            return Node.execute(request, query, cls, stats=stats,
+                                variables=variables)
+
+        @classmethod
+        def execute_batch(cls, request, queries:list, stats:dict=None,
+                          variables:list=None):
+            """
+            Execute a list of query strings as a single unit, returning their
+            results in the same order. Nodes of different queries share
+            Contexts and memoized results, and those on batch paths are
+            executed in one call. A query that fails to parse or raises is
+            returned as its exception without affecting the others.
+            `variables` is an optional list of variables for each query.
+            """
+            return Node.execute_queries(request, queries, cls, stats=stats,
+                                        variables=variables)
+
+        @classmethod
+        def execute_iter(cls, request, query:str, depth:int=None,
+                         variables:dict=None):
+            """
+            Execute a query, yielding `(response_path, result)` pairs as the
+            result of each node is complete, e.g. `(('jim', 'location'),
+            {...})`. Top-level results are yielded as soon as they are done
+            and are not kept once yielded. Pass `depth=1` to receive only
+            top-level results.
+            """
+            return Node.execute_iter(request, query, cls, depth=depth,
+                                     variables=variables)
+
+        @classmethod
+        def execute_to(cls, request, query:str, fp, variables:dict=None):
+            """
+            Execute a query, writing the result as JSON to the writable text
+            stream `fp` one top-level field at a time, in the order they
+            complete. Results are not kept once they have been written.
+            """
+            events = cls.execute_iter(request, query, depth=1,
+                                      variables=variables)
+            write_json(events, fp)
+
+        @classmethod
+        async def execute_async(cls, request, query:str, stats:dict=None,
+                                variables:dict=None):
+            return await Node.execute_async(request, query, cls, stats=stats,
+                                            variables=variables)
 
-        @staticmethod
-        def scan(*args, **kwargs):
+        @classmethod
+        def on_node_start(cls, callback):
             """
-            Run the callbacks registered in `self.__call__`.
+            Register `callback(span)` to be called before each phase of
+            each node is executed. See `pygql.tracing.Span`. Can be used as
+            a decorator.
+            """
+            if cls.hooks is None:
+                cls.hooks = Hooks()
+            cls.hooks.start.append(callback)
+            return callback
+
+        @classmethod
+        def on_node_end(cls, callback):
+            """
+            Register `callback(span)` to be called after each phase of each
+            node, with its timing and result size.
+            """
+            if cls.hooks is None:
+                cls.hooks = Hooks()
+            cls.hooks.end.append(callback)
+            return callback
+
+        @classmethod
+        def add_collector(cls, collector):
+            """
+            Register the `on_node_start` and `on_node_end` methods of
+            `collector`, such as a `pygql.tracing.ChromeTraceCollector`.
+            """
+            if hasattr(collector, 'on_node_start'):
+                cls.on_node_start(collector.on_node_start)
+            if hasattr(collector, 'on_node_end'):
+                cls.on_node_end(collector.on_node_end)
+            return collector
+
+        @classmethod
+        def clear_hooks(cls):
+            """
+            Remove all tracing callbacks.
+            """
+            cls.hooks = None
+
+        @classmethod
+        def invalidate(cls, path:str, args:dict=None):
+            """
+            Remove cached results of the path function registered at the
+            dotted `path` for the given node args, or all of them if `args`
+            is None. Returns the number of entries removed.
+            """
+            return invalidate(cls.root[path], args)
+
+        @classmethod
+        def register_query(cls, query_id:str, text:str):
+            """
+            Register a persisted query under `query_id`, which defaults to
+            the SHA-256 hex digest of the query text. The query is parsed
+            and compiled immediately, so that unknown paths are reported here
+            rather than when a request arrives. Returns the query ID.
+            """
+            if query_id is None:
+                query_id = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            query = Query(text, Node._parse(text, cls.limits))
+            if query.template is not None:
+                query.compile(cls.root, cls.registry_version)
+            cls.persisted_queries[query_id] = query
+            return query_id
+
+        @classmethod
+        def execute_persisted(cls, request, query_id:str, args:dict=None,
+                              stats:dict=None):
+            """
+            Execute the query registered under `query_id`. `args` are made
+            available to path functions through `node.root.args` and are
+            also the values of the query's variables.
+            """
+            query = cls.persisted_queries.get(query_id)
+            if query is None:
+                raise UnknownQuery(query_id)
+            return Node.execute_query(request, query, cls, args=args,
+                                      stats=stats)
+
+        @classmethod
+        def warmup(cls):
+            """
+            Compile every persisted query against the current registry.
+            Call this after `scan` at startup so that the first requests
+            do not pay for compilation.
+            """
+            for query in cls.persisted_queries.values():
+                if query.template is not None:
+                    query.compile(cls.root, cls.registry_version)
+
+        @classmethod
+        def scan(cls, *args, **kwargs):
+            """
+            Run the callbacks registered in `self.__call__`, then freeze the
+            registry.
             """
             scanner = venusian.Scanner()
             scanner.scan(*args, **kwargs)
+            cls.freeze()
+
+        @classmethod
+        def load_manifest(cls, manifest):
+            """
+            Register paths from a manifest written by `pygql.manifest`, given
+            as a file name or a dict, instead of scanning packages. Path
+            functions and Contexts are imported the first time they are
+            used.
+            """
+            from pygql.manifest import load
+
+            if isinstance(manifest, str):
+                with open(manifest) as fp:
+                    manifest = json.load(fp)
+            load(cls, manifest)
+
+        @classmethod
+        def freeze(cls):
+            """
+            Index the path tree by dotted name and make it read-only, so
+            that unknown names in queries raise `NotFound` without adding
+            Paths to the registry. Plans compiled beforehand are discarded.
+            """
+            cls.root.freeze()
+            cls.registry_version += 1
 
     return graph
@@ -0,0 +1,164 @@
+"""
+Registration from a manifest rather than a venusian scan. A manifest maps
+each dotted path to a `module:function` reference and the options it was
+registered with. Loading one imports nothing: each path function or
+Context class is imported the first time it is used.
+
+Generate a manifest from a scan with:
+
+    python -m pygql.manifest my_app.graph:graph my_app.paths -o manifest.json
+
+and load it at startup with `graph.load_manifest('manifest.json')`.
+"""
+import argparse
+import importlib
+import json
+import sys
+
+
+__all__ = ['dump', 'load', 'LazyRef']
+
+
+VERSION = 1
+
+# registration options written as plain values
+OPTIONS = ('yields', 'redirect', 'batch', 'memoize', 'join_many')
+
+# registration options that may be functions, written as references
+CALLABLE_OPTIONS = ('join_on', 'cost', 'fanout')
+
+
+class LazyRef(object):
+    """
+    Stands in for the object referenced by `module:qualname` in the `attr`
+    slot of `path`. It is imported when first called or inspected, and then
+    replaces itself on the path.
+    """
+
+    __slots__ = ('ref', 'path', 'attr')
+
+    def __init__(self, ref:str, path, attr:str):
+        self.ref = ref
+        self.path = path
+        self.attr = attr
+
+    def resolve(self):
+        obj = import_ref(self.ref)
+        setattr(self.path, self.attr, obj)
+        return obj
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name:str):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        return 'LazyRef<{}>'.format(self.ref)
+
+
+def import_ref(ref:str):
+    module_name, _, qualname = ref.partition(':')
+    obj = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def to_ref(obj):
+    """ The `module:qualname` reference of a module-level function or
+        class. Raises ValueError for lambdas, closures and other objects
+        that cannot be imported by name.
+    """
+    module = getattr(obj, '__module__', None)
+    qualname = getattr(obj, '__qualname__', None)
+    if module is None or qualname is None or '<' in qualname:
+        raise ValueError('{!r} cannot be imported by name'.format(obj))
+    return '{}:{}'.format(module, qualname)
+
+
+def dump(graph):
+    """
+    Build the manifest of the paths registered on a scanned graph.
+    """
+    paths = {}
+    for name, path in sorted(graph.root.index.items()):
+        if path.execute is None:
+            continue  # intermediate path with no function of its own
+        if path.cache is not None or path.cache_key is not None:
+            raise ValueError(
+                'path {} has a cache, which cannot be written to a '
+                'manifest'.format(name))
+        entry = {
+            'function': to_ref(path.execute),
+            'context': (
+                to_ref(path.context_class)
+                if path.context_class is not None else None),
+        }
+        for option in OPTIONS:
+            entry[option] = getattr(path, option)
+        for option in CALLABLE_OPTIONS:
+            value = getattr(path, option)
+            if callable(value):
+                entry[option] = {'ref': to_ref(value)}
+            else:
+                entry[option] = value
+        paths[name] = entry
+    return {'version': VERSION, 'paths': paths}
+
+
+def load(graph, manifest:dict):
+    """
+    Register the paths of `manifest` on `graph` and freeze its registry.
+    """
+    if manifest.get('version') != VERSION:
+        raise ValueError('unsupported manifest version: {}'.format(
+            manifest.get('version')))
+
+    root = graph.root
+    for name, entry in manifest['paths'].items():
+        path = root.traverse(name, create=True)
+        path.root = root
+        path.name = name
+        path.execute = LazyRef(entry['function'], path, 'execute')
+        if entry.get('context') is not None:
+            path.context_class = LazyRef(
+                entry['context'], path, 'context_class')
+        for option in OPTIONS:
+            if option in entry:
+                setattr(path, option, entry[option])
+        for option in CALLABLE_OPTIONS:
+            value = entry.get(option)
+            if isinstance(value, dict):
+                value = LazyRef(value['ref'], path, option)
+            elif isinstance(value, list):
+                value = tuple(value)
+            if value is not None:
+                setattr(path, option, value)
+    graph.freeze()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Write the manifest of a graph after scanning packages.')
+    parser.add_argument('graph', help='graph reference, e.g. my_app:graph')
+    parser.add_argument('packages', nargs='+',
+                        help='packages or modules to scan')
+    parser.add_argument('-o', '--output', help='file to write the manifest to')
+    args = parser.parse_args(argv)
+
+    graph = import_ref(args.graph)
+    for package in args.packages:
+        graph.scan(importlib.import_module(package))
+    manifest = dump(graph)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(manifest, fp, indent=2, sort_keys=True)
+    else:
+        json.dump(manifest, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,11 @@
-from collections import Counter, deque
+import inspect
+
+from collections import namedtuple
+from copy import deepcopy
+from types import MappingProxyType
 
 from graphql import parse
+from graphql.language import ast
 from graphql.language.source import Source
 
 from pygql.exceptions import (
@@ -8,21 +13,30 @@ from pygql.exceptions import (
     InvalidResult,
     FieldValidationError,
     FieldAmbiguityError,
-    NotFound,
+    InvalidFragment,
+    QueryCostExceeded,
+    QueryLimitExceeded,
+    RateLimited,
 )
 
+from pygql.columns import Columns
+from pygql.cost import estimate_cost
 from pygql.schema import Schema
 from pygql.context import Context
-from pygql.path import Path
+from pygql.plan import Execution, Query, execute_batch, execute_batch_async
+from pygql.variables import rename, resolve_args, value_from_ast
+
 
+__all__ = ['Node', 'Limits']
 
-__all__ = ['Node']
 
+# Bounds on the size of a parsed query. `None` means unbounded.
+#   - `max_depth`: deepest level of nested selections
+#   - `max_nodes`: total number of selections, fields included
+#   - `max_aliases`: number of aliased selections in one selection set
+Limits = namedtuple('Limits', ['max_depth', 'max_nodes', 'max_aliases'])
 
-IDX_LABEL = 0
-IDX_NODE  = 1
-IDX_PATH  = 2
-IDX_IGNORE_RESULT = 3
+NO_LIMITS = Limits(None, None, None)
 
 
 class RerouteException(Exception):
@@ -30,37 +44,83 @@ class RerouteException(Exception):
         self.node = node
         self.location = location
 
+def lazy_slot(name:str, factory):
+    """ Property over the slot `name` that holds a container, which is only
+        created by `factory` the first time it is accessed.
+    """
+    def fget(self):
+        value = getattr(self, name)
+        if value is None:
+            value = factory()
+            setattr(self, name, value)
+        return value
+
+    def fset(self, value):
+        setattr(self, name, value)
+
+    return property(fget, fset)
+
+
+# Shared read-only stand-in for containers that have not been created.
+EMPTY = MappingProxyType({})
+
+
 class Node(object):
-    def __init__(self, root, parent=None):
+    __slots__ = (
+        'root',
+        'parent',
+        'name',
+        'alias',
+        'context',
+        'schema',
+        '_children',
+        '_fields',
+        '_args',
+        '_state',
+        '_result',
+        '_generator',
+        '_has_state',
+        '_is_validated',
+    )
+
+    # Child nodes, representing nested objects/relationships
+    children = lazy_slot('_children', dict)
+
+    # The data elements queried at this node
+    fields = lazy_slot('_fields', list)
+
+    # Arguments passed to the GraphQL node
+    args = lazy_slot('_args', dict)
+
+    # Yielded state (see the @graph yields param docs)
+    state = lazy_slot('_state', dict)
+
+    # The "return value" of the node's execution function,
+    # merged into the parent node, if exists.
+    result = lazy_slot('_result', dict)
+
+    def __init__(self, root=None, parent=None, name:str=None, alias:str=None,
+                 args:dict=None, fields:list=None, children:dict=None):
         self.root = root        # absolute root node
         self.parent = parent    # The parent node
 
         # Unaliased name of the GraphQL node
-        self.name = None
+        self.name = name
 
         # GraphQL node alias
-        self.alias = None
-
-        # Child nodes, representing nested objects/relationships
-        self.children = {}
+        self.alias = alias
 
-        # The data elements queried at this node
-        self.fields = []
-
-        # Arguments passed to the GraphQL node
-        self.args = {}
-
-        # Yielded state (see the @graph yields param docs)
-        self.state = {}
+        # Containers are created on first access. See `lazy_slot`.
+        self._children = children
+        self._fields = fields
+        self._args = args
+        self._state = None
+        self._result = None
 
         # User-defined object that implements the Context interface,
         # performs authorization.
         self.context = None
 
-        # The "return value" of the node's execution function,
-        # merged into the parent node, if exists.
-        self.result = {}
-
         # Schema instance returned by Context.authorize method
         self.schema = None
 
@@ -75,26 +135,47 @@ class Node(object):
         self._is_validated = False
 
     def copy(self):
-        copy = Node(self.root)
-        copy.name = self.name
-        copy.parent = self.parent
-        copy.schema = self.schema
-        copy.alias = self.alias
-        copy.children = self.children
-        copy.fields = self.fields
-        copy.state = self.state
-        copy.context = self.context
-        copy.result = self.result
-        copy._generator = self._generator
-        copy._has_state = self._has_state
-        copy._is_validated = self._is_validated
+        copy = Node.__new__(Node)
+        for name in Node.__slots__:
+            setattr(copy, name, getattr(self, name))
         return copy
 
+    def clone(self, parent=None, root=None):
+        """ Return a fresh copy of the node tree rooted at this node. Only the
+            parsed structure (name, alias, args, fields and children) is
+            copied; per-request state starts out empty. This is how cached
+            query templates are handed out to individual requests.
+        """
+        top = self._clone_node(parent, root)
+        if root is None:
+            top.root = root = top
+        stack = [(self, top)]
+        while stack:
+            source, target = stack.pop()
+            if source._children:
+                children = target._children = {}
+                for k, v in source._children.items():
+                    children[k] = child = v._clone_node(target, root)
+                    stack.append((v, child))
+        return top
+
+    def _clone_node(self, parent, root):
+        clone = Node(root, parent, self.name, self.alias)
+        if self._args:
+            # list and object literals are not shared with the template
+            clone._args = {
+                k: deepcopy(v) if isinstance(v, (list, dict)) else v
+                for k, v in self._args.items()
+            }
+        if self._fields:
+            clone._fields = list(self._fields)
+        return clone
+
     def __getitem__(self, key:str):
-        return self.children.get(key)
+        return (self._children or EMPTY).get(key)
 
     def __contains__(self, child_name:str):
-        return child_name in self.children
+        return child_name in (self._children or EMPTY)
 
     def reroute(self, dotted_path:str):
         raise RerouteException(self, dotted_path)
@@ -103,121 +184,212 @@ class Node(object):
     def is_validated(self):
         return self._is_validated
 
+    def flatten(self):
+        """ Return this node followed by all of its descendants, in the
+            pre-order that `Plan` uses to address nodes.
+        """
+        nodes = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if node._children:
+                stack.extend(reversed(list(node._children.values())))
+        return nodes
+
     @classmethod
-    def execute(cls, request, query, graph):
+    def execute(cls, request, query, graph, stats:dict=None,
+                variables:dict=None):
         """ Execute a GraphQL node.
 
             Args:
                 - request: HTTP Request object from your web framework
                 - query: GraphQL query string
                 - graph: `pygql.graph.Graph` class reference
+                - stats: Optional dict in which per-request counters, such
+                    as `context_hits` and `context_misses`, are stored.
+                - variables: Values of the `$variables` used in the query.
         """
-        root_label = None
-        root_node = cls.parse(query)
-        root_path = graph.root
-
-        # Enqueue the nodes inte query in depth-first order
-        # and init their Contexts
-        queue = cls._enqueue(request, root_label, root_node, root_path)
-        while queue:
-            label, node, path, ignore = queue.popleft()
-
-            # Generate node.state for consumption by child nodes
-            if path.yields and (not node._has_state):
-                node._generate_state(request, path)
-                continue
+        query = cls._lookup(query, graph.parse_cache, graph.limits)
+        return cls.execute_query(request, query, graph, stats=stats,
+                                 variables=variables)
 
-            if node == root_node:
-                continue
-
-            # call node.execute
-            result = node._execute_node(request, path, ignore)
+    @classmethod
+    def execute_query(cls, request, query:Query, graph, args:dict=None,
+                      stats:dict=None, variables:dict=None):
+        """ Execute a parsed `pygql.plan.Query`.
 
-            # translate the result and store in parent
-            if not (result is None or ignore):
-                node._process_result(result, label, path)
+            Args:
+                - request: HTTP Request object from your web framework
+                - query: `Query` from the parse cache or persisted queries
+                - graph: `pygql.graph.Graph` class reference
+                - args: Arguments for the root node, available to path
+                    functions through `node.root.args`, and used as values
+                    of the query's variables.
+                - stats: See `execute`.
+                - variables: See `execute`.
+        """
+        if query.template is None:
+            return None
+        plan, nodes = cls._prepare(request, query, graph, args, variables)
+        if graph.executor is not None:
+            return plan.execute_concurrent(request, nodes, graph.executor,
+                                           stats, graph.hooks)
+        return plan.execute(request, nodes, stats, graph.hooks)
 
-        return root_node.result
+    @classmethod
+    def execute_queries(cls, request, queries:list, graph, stats:dict=None,
+                        variables:list=None):
+        """ Execute several GraphQL query strings as one combined query, so
+            that they share Contexts and memoized results, and sibling nodes
+            on batch paths are executed together across queries. Returns
+            one result per query, in order, or the exception raised by it.
+
+            Errors are isolated by query within the combined execution: once
+            a node of a query raises, the rest of that query is skipped and
+            no query is executed twice. A batch call that raises fails every
+            query with a node in it. `max_cost` applies to each query on its
+            own, while the limiter is charged once with the total cost of the
+            queries within it; if it refuses, `RateLimited` is returned for
+            each of them.
+            `variables` is an optional list of variables for each query.
+        """
+        variables = variables or [None] * len(queries)
+        results = [None] * len(queries)
+        entries = []
+        costs = []
+        for i, text in enumerate(queries):
+            try:
+                query = cls._lookup(text, graph.parse_cache, graph.limits)
+                if query.template is None:
+                    continue
+                # report unknown paths, missing variables and excessive
+                # cost for this query alone
+                plan, nodes = cls._instantiate(query, graph,
+                                               variables=variables[i])
+                if graph.max_cost is not None or graph.limiter is not None:
+                    cost = estimate_cost(plan, nodes)
+                    if graph.max_cost is not None and cost > graph.max_cost:
+                        raise QueryCostExceeded(cost, graph.max_cost)
+                    costs.append(cost)
+            except Exception as exc:
+                results[i] = exc
+            else:
+                entries.append((i, query))
+        if not entries:
+            return results
+
+        try:
+            if graph.limiter is not None and \
+                    not graph.limiter.acquire(request, sum(costs)):
+                raise RateLimited(sum(costs))
+            combined = cls._combine(entries, graph.batch_cache)
+            plan, nodes = cls._instantiate(combined, graph, variables={
+                '{}:{}'.format(i, k): v
+                for i, _ in entries for k, v in (variables[i] or {}).items()
+            })
+        except Exception as exc:
+            for i, _ in entries:
+                results[i] = exc
+            return results
+
+        result, errors = plan.execute_isolated(
+            request, nodes, lambda label: int(label.split(':', 1)[0]),
+            stats, graph.hooks
+        )
+        for i, _ in entries:
+            results[i] = errors.get(i, {})
+        for key, value in result.items():
+            i, label = key.split(':', 1)
+            i = int(i)
+            if i not in errors:
+                results[i][label] = value
+        return results
 
     @classmethod
-    def _enqueue(cls, request, label, node, path, root_path=None, queue=None):
-
-        # base case:
-        if queue is None:
-            queue = deque()
-            root_path = path
-
-        # ensure that some function has been registered
-        # by @graph for the given path.
-        if path.name != Path.ROOT_NAME and path.execute is None:
-            raise NotFound(path.name)
-
-        # If the node has state (i.e. "yields"), it means
-        # that node.execute is a generator function;
-        # therefore, we must invoke the generator before any
-        # child nodes execute to ensure that parent state is
-        # available to them. We will invoke the generator
-        # for a second and final time in the usual
-        # depth-first order (i.e. after child nodes).
-        if path.yields:
-            assert not path.has_redirect
-            queue.append((label, node, path, False))
-
-        # Since one target redirect path can redirect to yet
-        # another, we collect the entire sequence of
-        # redirecting Paths. Later, we continue the
-        # recursive enqueue procedure relative to the tail
-        # Path of the sequence, but we still execute each
-        # one at this level of the recursion following
-        # said enqueuing.
-        redirect_paths = []
-        if path.has_redirect:
-            p = root_path[path.redirect]
-            while True:
-                assert not p.yields
-                redirect_paths.append(p)
-                if not p.has_redirect:
-                    break
-                p = root_path[p.redirect]
-            effective_path = redirect_paths[-1]
-        else:
-            effective_path = path
-
-        # enqueue children relative to the effective path
-        for child_label, child_node in node.children.items():
-            child_path = effective_path[child_node.name]
-            cls._enqueue(request,
-                         child_label, child_node, child_path,
-                         root_path=root_path, queue=queue)
-
-        if redirect_paths:
-            # executing redirect paths consists of passing
-            # the same node object to the sequence of
-            # path.execute functions.
-            for p in redirect_paths:
-                node_copy = node.copy() 
-                # XXX: do we want to update parent references?
-                if p.context_class:
-                    node_copy.context = p.context_class(request, node_copy)
-                    node_copy.schema = node_copy.context.authorize(request, node_copy)
-                    node_copy._validate(request, path)
-                queue.append((label, node_copy, p, True))
-        else:
-            queue.append((label, node, path, False))
+    def _combine(cls, entries:list, cache=None):
+        # The top-level nodes of each query become children of one root,
+        # labelled `<index>:<label>`, and their variables are renamed the
+        # same way. Combined templates are cached by the query strings they
+        # were built from, in `graph.batch_cache`.
+        key = tuple((i, query.text) for i, query in entries)
+        combined = cache.get(key) if cache is not None else None
+        if combined is None:
+            root = Node()
+            root.root = root
+            children = root.children
+            for i, query in entries:
+                prefix = '{}:'.format(i)
+                for label, child in query.template.children.items():
+                    children[prefix + label] = child = child.clone(root, root)
+                    for node in child.flatten():
+                        if node._args:
+                            node.args = rename(node.args, prefix)
+            combined = Query(key, root)
+            if cache is not None:
+                cache.set(key, combined)
+        return combined
 
-        # NOTE:
-        # Since context is instantiated in depth-first order, note that
-        # we would not have access to parent context from within any given
-        # child context unless with instantiated each context in a first
-        # passed preceding the node execution step.
-        if path.context_class is not None:
-            node.context = path.context_class(request, node)
-            node.schema = node.context.authorize(request, node)
-            node._validate(request, path)
+    @classmethod
+    def execute_iter(cls, request, query, graph, depth:int=None,
+                     variables:dict=None):
+        """ Execute a GraphQL node, yielding `(response_path, result)` as the
+            result of each node is merged into its parent. See
+            `pygql.plan.Execution.iterate`.
+        """
+        query = cls._lookup(query, graph.parse_cache, graph.limits)
+        if query.template is None:
+            return
+        plan, nodes = cls._prepare(request, query, graph, variables=variables)
+        execution = Execution(plan, request, nodes, hooks=graph.hooks)
+        yield from execution.iterate(depth)
 
+    @classmethod
+    async def execute_async(cls, request, query, graph, args:dict=None,
+                            stats:dict=None, variables:dict=None):
+        """ Execute a GraphQL node on the running asyncio event loop. Path
+            functions may be coroutine functions or, for paths that yield,
+            async generators. Sibling subtrees are executed concurrently.
+        """
+        if isinstance(query, str):
+            query = cls._lookup(query, graph.parse_cache, graph.limits)
+        if query.template is None:
+            return None
+        plan, nodes = cls._prepare(request, query, graph, args, variables)
+        return await plan.execute_async(request, nodes, stats, graph.hooks)
 
-        return queue
+    @classmethod
+    def _prepare(cls, request, query:Query, graph, args:dict=None,
+                 variables:dict=None):
+        plan, nodes = cls._instantiate(query, graph, args, variables)
+
+        # admission control, before any Context or path function runs
+        if graph.max_cost is not None or graph.limiter is not None:
+            cost = estimate_cost(plan, nodes)
+            if graph.max_cost is not None and cost > graph.max_cost:
+                raise QueryCostExceeded(cost, graph.max_cost)
+            if graph.limiter is not None and \
+                    not graph.limiter.acquire(request, cost):
+                raise RateLimited(cost)
+        return plan, nodes
 
+    @classmethod
+    def _instantiate(cls, query:Query, graph, args:dict=None,
+                     variables:dict=None):
+        # The plan is compiled once per query shape and registry version;
+        # each request runs it against a fresh copy of the node tree.
+        plan = query.compile(graph.root, graph.registry_version)
+        nodes = query.template.clone().flatten()
+        if args:
+            nodes[0].args.update(args)
+        if query.variables:
+            values = dict(args) if args else {}
+            if variables:
+                values.update(variables)
+            for index in query.variables:
+                node = nodes[index]
+                node.args = resolve_args(node.args, values)
+        return plan, nodes
 
     def _process_result(self, result, label, path):
         if result is None:
@@ -233,7 +405,16 @@ class Node(object):
             # the results set by children, which should also be lists,
             # into a single merged array of dicts.
             if self.schema is not None:
-                result = [self.schema.dump(x) for x in result]
+                result = self.schema.dump_many(result)
+            self.result = result
+        elif isinstance(result, Columns):
+            # Results set by children, which should be lists of the same
+            # length, are attached as additional columns.
+            if self.schema is not None:
+                result = self.schema.dump_columns(result)
+            if isinstance(self._result, dict):
+                for k, v in self._result.items():
+                    result[k] = v
             self.result = result
         else:
             raise InvalidResult(path.name, result)
@@ -242,12 +423,86 @@ class Node(object):
         if self.parent is not None:
             self.parent.result[label] = self.result
 
+    def _join(self, label, child, child_path):
+        """ Merge the list result of a child node on a path registered with
+            `join_on` into the rows of this node's result, matching rows by
+            key through a hash index of the child rows. The child key is
+            removed from the joined rows unless the child node selects it;
+            see `_drop_join_keys` for the parent key.
+        """
+        join_on = child_path.join_on
+        if isinstance(join_on, str):
+            parent_key = child_key = join_on
+        else:
+            parent_key, child_key = join_on
+
+        child_rows = child.result
+        if isinstance(child_rows, Columns):
+            child_rows = child_rows.rows()
+        elif isinstance(child_rows, dict):
+            child_rows = [child_rows] if child_rows else []
+
+        pairs = ((row.get(child_key), row) for row in child_rows)
+        if child_key not in child.fields:
+            pairs = (
+                (key, {k: v for k, v in row.items() if k != child_key})
+                for key, row in pairs
+            )
+        index = {}
+        if child_path.join_many:
+            for key, row in pairs:
+                index.setdefault(key, []).append(row)
+            missing = ()
+        else:
+            for key, row in pairs:
+                index.setdefault(key, row)
+            missing = None
+
+        if isinstance(self.result, Columns):
+            self.result[label] = [
+                index.get(k, missing) for k in self.result[parent_key]
+            ]
+        else:
+            rows = self.result
+            if isinstance(rows, dict):
+                rows = [rows]
+            for row in rows:
+                match = index.get(row.get(parent_key), missing)
+                row[label] = list(match) if missing is not None else match
+
+    def _drop_join_keys(self, joins:tuple):
+        """ Remove the keys that child nodes were joined on from the rows of
+            this node's result, unless this node selects them. They are kept
+            until every child in `joins` has been joined.
+        """
+        keys = set()
+        for _, _, child_path in joins:
+            join_on = child_path.join_on
+            keys.add(join_on if isinstance(join_on, str) else join_on[0])
+        keys.difference_update(self.fields)
+        if not keys:
+            return
+        if isinstance(self.result, Columns):
+            for key in keys:
+                if key in self.result:
+                    del self.result[key]
+            return
+        rows = self.result
+        if isinstance(rows, dict):
+            rows = [rows]
+        for row in rows:
+            for key in keys:
+                row.pop(key, None)
+
     def _generate_state(self, request, path):
         self._generator = path.execute(request, self)
         self.state = self._generator.send(None)
         self._has_state = True
 
     def _execute_node(self, request, path, ignore):
+        if path.batch:
+            # e.g. a redirect to a batch path, executed on its own
+            return execute_batch(request, path, [self])[0]
         if not self._has_state:
             result = path.execute(request, self)
         else:
@@ -256,6 +511,30 @@ class Node(object):
             self._has_state = False
         return result
 
+    async def _generate_state_async(self, request, path):
+        self._generator = path.execute(request, self)
+        if inspect.isasyncgen(self._generator):
+            self.state = await self._generator.__anext__()
+        else:
+            self.state = self._generator.send(None)
+        self._has_state = True
+
+    async def _execute_node_async(self, request, path, ignore):
+        if path.batch:
+            return (await execute_batch_async(request, path, [self]))[0]
+        if not self._has_state:
+            result = path.execute(request, self)
+            if inspect.isawaitable(result):
+                result = await result
+        else:
+            # this is for paths that "yield"
+            if inspect.isasyncgen(self._generator):
+                result = await self._generator.__anext__()
+            else:
+                result = self._generator.send(None)
+            self._has_state = False
+        return result
+
     def _validate(self, request, path):
         # TODO: merge this logic to reduce number of times
         # fields are iterated through.
@@ -264,77 +543,242 @@ class Node(object):
         self._is_validated = True
 
     def _validate_fields(self):
-        valid_names, unrec_names = self.schema.translate(self.fields)
+        valid_names, unrec_names, duplicate_names = \
+            self.schema.validate(self.fields)
         if unrec_names:
             raise FieldValidationError(self, unrec_names)
-        self._raise_for_duplicate_fields(valid_names)
+        if duplicate_names:
+            raise FieldAmbiguityError(self, duplicate_names)
         self.fields = valid_names
 
     def _validate_children(self):
         # we use child path `name` attributes instead of the keys in
         # `children` because the keys are a mixture of valid field names
         # as well as field aliases; whereas path.name is always the field name.
-        names = set(v.name for v in self.children.values())
-        valid_names, unrec_names = self.schema.translate(names, nested=True)
+        names = set(v.name for v in (self._children or EMPTY).values())
+        valid_names, unrec_names, duplicate_names = \
+            self.schema.validate(names, nested=True)
         if unrec_names:
             raise FieldValidationError(self, unrec_names)
-        self._raise_for_duplicate_fields(valid_names)
-
-    def _raise_for_duplicate_fields(self, field_names:list):
-        counter = Counter()
-        duplicate_names = []
-        for k in field_names:
-            counter[k] += 1
-            if counter[k] == 2:
-                duplicate_names.append(k)
         if duplicate_names:
             raise FieldAmbiguityError(self, duplicate_names)
 
     @classmethod
-    def parse(cls, node):
+    def parse(cls, node, cache=None, limits:Limits=None):
         """ Parse graphql-code AST into a Context tree.
+
+            If a `cache` (see `pygql.cache.LRUCache`) is given, the node tree
+            built for each distinct query string is kept as a template, and
+            subsequent calls return a clone of it instead of parsing again.
+            `limits` bound the size of the tree; see `Limits`.
         """
+        if cache is not None:
+            template = cls._lookup(node, cache, limits).template
+            return template.clone() if template is not None else None
+        return cls._parse(node, limits)
+
+    @classmethod
+    def _lookup(cls, text, cache=None, limits:Limits=None):
+        """ Fetch the `Query` entry for a query string from the parse cache,
+            parsing the string on a miss.
+        """
+        query = cache.get(text) if cache is not None else None
+        if query is None:
+            query = Query(text, cls._parse(text, limits))
+            if cache is not None:
+                cache.set(text, query)
+        return query
+
+    @classmethod
+    def _parse(cls, node, limits:Limits=None):
         doc_ast = parse(Source(node))
-        if doc_ast.definitions:
-            op_def = doc_ast.definitions[0]
+        operations = []
+        fragments = {}
+        for definition in doc_ast.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                fragments[definition.name.value] = definition
+            else:
+                operations.append(definition)
+        if operations:
+            op_def = operations[0]
             if op_def.operation != 'query':
                 raise InvalidOperation(op_def.name.value)
-            root = cls._build_node(op_def)
+            root = cls._build_node(op_def, limits=limits, fragments=fragments)
             return root
         return None
 
     @classmethod
-    def _build_node(cls, ast_path, root=None, parent=None):
+    def _build_node(cls, ast_path, root=None, parent=None, limits:Limits=None,
+                    fragments:dict=None):
+        """
+        Process a graphql-core AST path while parsing. The tree is built
+        from an explicit stack rather than by recursion, and `limits` are
+        enforced as it grows, before any Context is instantiated. Fragment
+        spreads and inline fragments are expanded in place; see `_expand`.
+        """
+        limits = limits or NO_LIMITS
+        fragments = fragments or {}
+        expanded = {}
+        definitions = {
+            definition.variable.name.value: definition
+            for definition in getattr(ast_path, 'variable_definitions', None)
+            or ()
+        }
+        node = cls._new_node(ast_path, root, parent, definitions)
+        # Each entry holds the selections that a node was built from, more
+        # than one if they were merged, in document order.
+        stack = [(node, [ast_path], 0)]
+        total = 0
+        while stack:
+            parent_node, parent_asts, depth = stack.pop()
+            selections = []
+            for parent_ast in parent_asts:
+                if not parent_ast.selection_set:
+                    continue
+                budget = None
+                if limits.max_nodes is not None:
+                    budget = limits.max_nodes - total - len(selections)
+                selections.extend(cls._expand(
+                    parent_ast.selection_set, fragments, expanded,
+                    budget, limits.max_nodes))
+            if not selections:
+                continue
+            depth += 1
+            total += len(selections)
+            if limits.max_depth is not None and depth > limits.max_depth:
+                raise QueryLimitExceeded('max_depth', limits.max_depth)
+            if limits.max_nodes is not None and total > limits.max_nodes:
+                raise QueryLimitExceeded('max_nodes', limits.max_nodes)
+            aliases = 0
+            selected = {}  # key -> (selection, selection set, child asts)
+            children = []
+            for child, source in selections:
+                # store children under alias if alias exists,
+                # use the otherwise typename.
+                if getattr(child, 'alias', None) is not None:
+                    key = child.alias.value
+                    aliases += 1
+                else:
+                    key = child.name.value
+                first = selected.get(key)
+                if first is not None:
+                    # A key selected again through a fragment or another
+                    # merged selection is merged into the first one, as
+                    # GraphQL requires, provided they select the same field
+                    # with the same args. Repeats within one selection set
+                    # are left to `_validate_fields` to reject.
+                    selection, first_source, child_asts = first
+                    if child is selection:
+                        continue  # the same fragment spread again
+                    if first_source is not source:
+                        if not cls._same_field(selection, child, definitions):
+                            raise FieldAmbiguityError(parent_node, key)
+                        if child_asts is not None:
+                            child_asts.append(child)
+                        continue
+                if child.selection_set:
+                    child_node = cls._new_node(child, root, parent_node,
+                                               definitions)
+                    parent_node.children[key] = child_node
+                    child_asts = [child]
+                    children.append((child_node, child_asts, depth))
+                else:
+                    parent_node.fields.append(key)
+                    child_asts = None
+                selected[key] = (child, source, child_asts)
+            if limits.max_aliases is not None and aliases > limits.max_aliases:
+                raise QueryLimitExceeded('max_aliases', limits.max_aliases)
+            stack.extend(children)
+
+        return node
+
+    @staticmethod
+    def _same_field(a, b, definitions:dict=None):
+        # Whether two selections of the same key can be merged.
+        if a.name.value != b.name.value:
+            return False
+        if bool(a.selection_set) != bool(b.selection_set):
+            return False
+        args_a, args_b = (
+            {
+                arg.name.value: value_from_ast(arg.value, definitions)
+                for arg in selection.arguments or ()
+            }
+            for selection in (a, b)
+        )
+        return args_a == args_b
+
+    @classmethod
+    def _expand(cls, selection_set, fragments:dict, expanded:dict,
+                budget:int=None, max_nodes:int=None):
         """
-        Process a graphql-core AST path while parsing.
+        Returns `(field, selection_set)` pairs for a selection set, where
+        the fields of fragment spreads and inline fragments are inlined
+        along with the selection set they appear in. The fields of each named fragment are expanded once
+        per query and shared by all of its spreads, via `expanded`. Type
+        conditions are not checked, as paths are not typed.
+
+        `budget` is the number of selections still allowed by `max_nodes`.
+        Expansion stops as soon as it is exceeded, so that spreads that
+        repeat a fragment many times are rejected before they are built.
         """
+        fields = []
+        stack = [(iter(selection_set.selections), selection_set)]
+        while stack:
+            selections, source = stack[-1]
+            for selection in selections:
+                if isinstance(selection, ast.InlineFragment):
+                    selection_set = selection.selection_set
+                    stack.append(
+                        (iter(selection_set.selections), selection_set))
+                    break
+                if isinstance(selection, ast.FragmentSpread):
+                    spread = cls._expand_fragment(
+                        selection.name.value, fragments, expanded, budget,
+                        max_nodes)
+                    if budget is not None and \
+                            len(fields) + len(spread) > budget:
+                        raise QueryLimitExceeded('max_nodes', max_nodes)
+                    fields.extend(spread)
+                else:
+                    if budget is not None and len(fields) >= budget:
+                        raise QueryLimitExceeded('max_nodes', max_nodes)
+                    fields.append((selection, source))
+            else:
+                stack.pop()
+        return fields
+
+    @classmethod
+    def _expand_fragment(cls, name:str, fragments:dict, expanded:dict,
+                         budget:int=None, max_nodes:int=None):
+        if name in expanded:
+            fields = expanded[name]
+            if fields is None:
+                raise InvalidFragment(name)  # spread within itself
+            return fields
+        definition = fragments.get(name)
+        if definition is None:
+            raise InvalidFragment(name)
+        expanded[name] = None
+        fields = cls._expand(definition.selection_set, fragments,
+                             expanded, budget, max_nodes)
+        expanded[name] = fields
+        return fields
+
+    @classmethod
+    def _new_node(cls, ast_path, root, parent, definitions:dict=None):
         node = cls(root=root, parent=parent)
 
         if ast_path.name:
             node.name = ast_path.name.value
 
         # TODO: Check type of ast_path instead. i.e. is selectionset
-        if hasattr(ast_path, 'alias') and ast_path.alias is not None:
+        if getattr(ast_path, 'alias', None) is not None:
             node.alias = ast_path.alias.value
 
-        node.args = {}
-        if hasattr(ast_path, 'arguments'):
+        if getattr(ast_path, 'arguments', None):
             node.args = {
-                arg.name.value: arg.value.value for arg in ast_path.arguments
+                arg.name.value: value_from_ast(arg.value, definitions)
+                for arg in ast_path.arguments
             }
-        node.children = {}
-        if ast_path.selection_set:
-            for child in ast_path.selection_set.selections:
-                # store children under alias if alias exists,
-                # use the otherwise typename.
-                if hasattr(child, 'alias') and child.alias is not None:
-                    key = child.alias.value
-                else:
-                    key = child.name.value
-                if child.selection_set:
-                    child_node = cls._build_node(child, root=root, parent=node)
-                    node.children[key] = child_node
-                else:
-                    node.fields.append(key)
-
         return node
@@ -1,4 +1,10 @@
 from collections import defaultdict
+from types import MappingProxyType
+
+from pygql.exceptions import NotFound, RedirectCycle
+
+
+EMPTY = MappingProxyType({})
 
 
 class Path(object):
@@ -10,9 +16,34 @@ class Path(object):
     yield a "user" Path with a "company" Path in its
     `children` dict. The keys in this dict are the names or aliases of the
     corresponding child Paths.
+
+    Once a graph is scanned, its tree is frozen. Lookups then go through a
+    flat index of dotted names and never create new Paths, so that unknown
+    names in client queries raise `NotFound` without growing the registry.
     """
     ROOT_NAME = '/'
 
+    __slots__ = (
+        'root',
+        'execute',
+        'context_class',
+        '_children',
+        'name',
+        'yields',
+        'redirect',
+        'batch',
+        'memoize',
+        'cache',
+        'cache_key',
+        'join_on',
+        'join_many',
+        'cost',
+        'fanout',
+        'frozen',
+        'index',
+        'redirects',
+    )
+
     def __init__(self, name:str=None, yields:bool=False):
         """
             - `self.execute`: callback function registered with the path
@@ -24,10 +55,29 @@ class Path(object):
         self.root = None
         self.execute = None
         self.context_class = None
-        self.children = defaultdict(Path)
+        self._children = None  # created on first access; see `children`
         self.name = name or ''
         self.yields = yields
         self.redirect = None
+        self.batch = False
+        self.memoize = False
+        self.cache = None
+        self.cache_key = None
+        self.join_on = None
+        self.join_many = False
+        self.cost = 1
+        self.fanout = 1
+        self.frozen = False
+        self.index = None       # dotted name -> Path; set on the frozen root
+        self.redirects = None   # redirect chain, resolved by `freeze`
+
+    @property
+    def children(self):
+        if self._children is None:
+            if self.frozen:
+                return EMPTY
+            self._children = defaultdict(Path)
+        return self._children
 
     def __getitem__(self, key:str):
         return self.traverse(key)
@@ -39,16 +89,35 @@ class Path(object):
     def has_redirect(self):
         return self.redirect is not None
 
-    def traverse(self, key:str):
+    def traverse(self, key:str, create:bool=None):
         """
         You can use a dotted path to implicitly create and fetch nested child
         paths. E.G. Suppose you have a new path called root. Then root['a.b.c']
         would instantiate a nesting of paths called 'a', 'b', and 'c'. This is
         the same as doing root['a']['b']['c'].
+
+        Frozen paths are only created if `create` is True; otherwise unknown
+        keys raise `NotFound`.
         """
         if not key:
             return self
 
+        if create is None:
+            create = not self.frozen
+
+        if not create:
+            if self.index is not None and isinstance(key, str):
+                path = self.index.get(key)
+                if path is None:
+                    raise NotFound(key)
+                return path
+            if isinstance(key, str):
+                key = key.split('.')
+            path = self
+            for k in key:
+                path = path.child(k)
+            return path
+
         if not isinstance(key, (list, tuple)):
             try:
                 key = key.split('.')
@@ -56,19 +125,81 @@ class Path(object):
                 import ipdb; ipdb.set_trace()
 
         path = self
-        for k in key:
-            path = path.children[k]
+        for i, k in enumerate(key):
+            if path._children is None:
+                path._children = defaultdict(Path)
+            child = path._children.get(k)
+            if child is None:
+                child = path._children[k] = Path('.'.join(key[:i + 1]))
+            path = child
 
         if not path.name:
             path.name = '.'.join(key)
         return path
 
+    def child(self, name:str):
+        """ Get the child path with the given name without creating it.
+        """
+        children = self._children
+        if children:
+            path = children.get(name)
+            if path is not None:
+                return path
+        if self.name and self.name != self.ROOT_NAME:
+            name = '{}.{}'.format(self.name, name)
+        raise NotFound(name)
+
+    def freeze(self):
+        """
+        Make the tree rooted at this path read-only: child dicts no longer
+        create missing entries, dotted names are indexed on this path and
+        the chain of paths each redirecting path leads to is resolved.
+        Paths may still be registered with `traverse(key, create=True)`;
+        they are indexed the next time the tree is frozen.
+        """
+        index = {}
+        stack = [(self, None)]
+        while stack:
+            path, key = stack.pop()
+            path.frozen = True
+            if path._children is not None:
+                path._children = dict(path._children)
+                stack.extend(
+                    (child, k if key is None else '{}.{}'.format(key, k))
+                    for k, child in path._children.items()
+                )
+            if key is not None:
+                # paths created through `children` have no name of their own
+                if not path.name:
+                    path.name = key
+                index[key] = path
+
+        for path in index.values():
+            path.redirects = None
+            if path.redirect is None:
+                continue
+            chain = []
+            p = index.get(path.redirect)
+            while p is not None:
+                if p is path or p in chain:
+                    raise RedirectCycle(
+                        [path.name] + [c.name for c in chain] + [p.name])
+                chain.append(p)
+                if p.redirect is None:
+                    path.redirects = tuple(chain)
+                    break
+                p = index.get(p.redirect)
+
+        self.index = index
+        return self
+
     def contains(self, key:str):
         if not isinstance(key, (list, tuple)):
             key = [key]
 
         path = self
         for k in key:
-            if k not in self.children:
+            if not path._children or k not in path._children:
                 return False
-            path = self[k]
+            path = path._children[k]
+        return True
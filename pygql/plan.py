@@ -0,0 +1,870 @@
+import asyncio
+import copy
+import inspect
+
+from collections import namedtuple
+from itertools import count
+
+from pygql.exceptions import InvalidBatchResult, NotFound, RedirectCycle
+from pygql.manifest import LazyRef
+from pygql.path import Path
+from pygql.tracing import (
+    Hooks,
+    PHASE_AUTHORIZE,
+    PHASE_CONTEXT,
+    PHASE_EXECUTE,
+    PHASE_RESULT,
+    PHASE_STATE,
+    PHASE_VALIDATE,
+)
+from pygql.util import freeze
+from pygql.variables import has_variables
+
+
+__all__ = ['Plan', 'Query', 'Execution']
+
+
+# Step operations
+OP_STATE = 0     # first pass of a yielding path: generate node.state
+OP_EXECUTE = 1   # call path.execute and merge the result into the parent
+OP_BATCH = 2     # call a batch path's execute once for all of `members`
+OP_ORDER = 3     # restore the query order of child results in the node
+OP_LOOKUP = 4    # reuse a memoized or cached subtree, skipping `members` steps
+OP_STORE = 5     # memoize or cache the result of the subtree just finished
+
+
+# A single unit of work in a compiled plan. `node` is the index of the node
+# in the pre-order listing returned by `Node.flatten`. `copy` is the slot of
+# a per-request node copy made for a redirect path, or None. OP_BATCH steps
+# have no node of their own; `members` is a tuple of (label, node) pairs.
+# For OP_ORDER steps, `members` is the tuple of child labels in query order.
+# For OP_LOOKUP and OP_STORE steps, `ignore` is set if the subtree is that of
+# a redirecting node, whose result is not merged into its parent.
+Step = namedtuple(
+    'Step', ['op', 'label', 'node', 'path', 'ignore', 'copy', 'members'],
+    defaults=(None,))
+
+# Context instantiation, authorization and validation for a node (or node
+# copy), performed in this order before any step executes.
+Binding = namedtuple('Binding', ['node', 'path', 'copy'])
+
+# Subtree of the plan rooted at a single node. `state` is the OP_STATE step
+# of a yielding path (or None), `children` are child frames, `batches` are
+# the OP_BATCH steps for children on batch paths and `steps` are the
+# OP_EXECUTE steps that run once all children and batches have finished.
+# `memo` is the Path that the subtree is memoized or cached under, if any.
+Frame = namedtuple(
+    'Frame', ['label', 'node', 'path', 'state', 'children', 'batches', 'steps',
+              'memo'])
+
+
+def execute_batch(request, path:Path, nodes:list):
+    """ Call the function of a batch path with a list of nodes, returning
+        one result per node.
+    """
+    results = path.execute(request, nodes)
+    return _check_batch(path, nodes, results)
+
+
+async def execute_batch_async(request, path:Path, nodes:list):
+    results = path.execute(request, nodes)
+    if inspect.isawaitable(results):
+        results = await results
+    return _check_batch(path, nodes, results)
+
+
+def _check_batch(path:Path, nodes:list, results):
+    if not isinstance(results, (list, tuple)) or len(results) != len(nodes):
+        raise InvalidBatchResult(path.name, len(nodes), results)
+    return results
+
+
+def subtree_key(node):
+    """ Identifies the args, validated fields and children of a subtree.
+    """
+    return (
+        freeze(node.args),
+        tuple(node.fields),
+        tuple(
+            (label, child.name, subtree_key(child))
+            for label, child in node.children.items()
+        ),
+    )
+
+
+def cache_key(request, path:Path, node, redirected:bool=False):
+    """ Key of a subtree in the per-request memo and the path's cache:
+        the path name, the subtree key, whether the subtree is reached
+        through a redirect and the path's `cache_key`, if any.
+    """
+    key = (path.name, subtree_key(node), redirected)
+    if path.cache_key is not None:
+        key += (path.cache_key(request, node),)
+    return key
+
+
+def invalidate(path:Path, args:dict=None):
+    """ Remove the cached results of `path` for the given args, or all of
+        its cached results if `args` is None.
+    """
+    if path.cache is None:
+        return 0
+    if args is None:
+        return path.cache.evict(lambda key: key[0] == path.name)
+    args = freeze(args)
+    return path.cache.evict(
+        lambda key: key[0] == path.name and key[1][0] == args)
+
+
+class Query(object):
+    """
+    Parse cache entry. Holds the node tree parsed from a query string
+    along with the plan compiled from it against the current registry.
+    """
+
+    def __init__(self, text:str, template):
+        self.text = text
+        self.template = template
+        self._plan = None
+        self._version = None
+
+        # indexes of the nodes whose args refer to query variables
+        self.variables = ()
+        if template is not None:
+            self.variables = tuple(
+                index for index, node in enumerate(template.flatten())
+                if node._args and has_variables(node._args)
+            )
+
+    def compile(self, root_path:Path, version:int=0):
+        """ Return the plan for this query, compiling it if the registry
+            has changed (see `graph.scan`) since it was last compiled.
+        """
+        plan = self._plan
+        if plan is None or self._version != version:
+            plan = Plan.compile(self.template, root_path)
+            self._plan, self._version = plan, version
+        return plan
+
+
+class Plan(object):
+    """
+    Immutable execution plan for one query shape. Compiling resolves each
+    node's `Path`, expands redirect chains and orders yield phases once, so
+    that executing a request only has to walk a flat list of steps.
+    """
+
+    def __init__(self, frame:Frame, bindings:list, copies:int):
+        self.frame = frame
+        self.bindings = tuple(bindings)
+        self.steps = tuple(self._flatten(frame))
+        self.copies = copies
+
+        # set by `pygql.cost.estimate_cost` if it does not depend on args
+        self.static_cost = None
+        self._top_level_steps = None
+
+        # labels leading from the root result to each node's result, and
+        # the children of each node that are joined into its result rows.
+        self.response_paths = {}
+        self.joins = {}
+        frames = [(frame, ())]
+        while frames:
+            f, response_path = frames.pop()
+            self.response_paths[f.node] = response_path
+            joins = tuple(
+                (child.label, child.node, child.path)
+                for child in f.children if child.path.join_on is not None
+            )
+            if joins:
+                self.joins[f.node] = joins
+            for child in f.children:
+                frames.append((child, response_path + (child.label,)))
+
+    @classmethod
+    def compile(cls, root_node, root_path:Path):
+        """ Compile the node tree rooted at `root_node` against the registry
+            rooted at `root_path`. The tree is walked with an explicit stack,
+            so that deeply nested queries cannot exhaust the call stack.
+        """
+        bindings = []
+        node_index = count()
+        copy_slots = count()
+        top = cls._enter_frame(None, root_node, root_path, root_path,
+                               next(node_index))
+        stack = [(top, iter(root_node.children.items()))]
+        while stack:
+            pending, children = stack[-1]
+            for child_label, child_node in children:
+                # compile children relative to the effective path
+                child_path = pending.effective_path.child(child_node.name)
+                child = cls._enter_frame(child_label, child_node, child_path,
+                                         root_path, next(node_index))
+                stack.append((child, iter(child_node.children.items())))
+                break
+            else:
+                stack.pop()
+                frame = cls._exit_frame(pending, copy_slots, bindings)
+                if not stack:
+                    return cls(frame, bindings, next(copy_slots))
+                stack[-1][0].add_child(frame)
+
+    @classmethod
+    def _enter_frame(cls, label, node, path, root_path, index):
+        # ensure that some function has been registered
+        # by @graph for the given path.
+        if path.name != Path.ROOT_NAME and path.execute is None:
+            raise NotFound(path.name)
+
+        # If the node has state (i.e. "yields"), it means
+        # that node.execute is a generator function;
+        # therefore, we must invoke the generator before any
+        # child nodes execute to ensure that parent state is
+        # available to them. We will invoke the generator
+        # for a second and final time in the usual
+        # depth-first order (i.e. after child nodes).
+        state = None
+        if path.yields:
+            assert not path.has_redirect
+            state = Step(OP_STATE, label, index, path, False, None)
+
+        # Since one target redirect path can redirect to yet
+        # another, we collect the entire sequence of
+        # redirecting Paths. Children are compiled relative
+        # to the tail Path of the sequence, but each one is
+        # executed at this level following said children.
+        redirect_paths = []
+        if path.redirects is not None:
+            redirect_paths = list(path.redirects)
+        elif path.has_redirect:
+            p = root_path[path.redirect]
+            while True:
+                assert not p.yields
+                if p is path or p in redirect_paths:
+                    raise RedirectCycle([path.name] + [
+                        r.name for r in redirect_paths] + [p.name])
+                redirect_paths.append(p)
+                if not p.has_redirect:
+                    break
+                p = root_path[p.redirect]
+
+        return _PendingFrame(label, index, path, state, redirect_paths)
+
+    @classmethod
+    def _exit_frame(cls, pending, copy_slots, bindings):
+        label, index, path = pending.label, pending.index, pending.path
+        batches = tuple(
+            Step(OP_BATCH, None, None, p, False, None, tuple(members))
+            for p, members in pending.batches.items()
+        )
+
+        steps = []
+        if pending.redirect_paths:
+            # executing redirect paths consists of passing
+            # a copy of the same node to the sequence of
+            # path.execute functions.
+            for p in pending.redirect_paths:
+                slot = next(copy_slots)
+                bindings.append(Binding(index, p, slot))
+                steps.append(Step(OP_EXECUTE, label, index, p, True, slot))
+        elif index != 0:
+            # the root node has no path function of its own
+            steps.append(Step(OP_EXECUTE, label, index, path, False, None))
+
+        # NOTE:
+        # Since context is instantiated in depth-first order, note that
+        # we would not have access to parent context from within any given
+        # child context unless with instantiated each context in a first
+        # passed preceding the node execution step.
+        if path.context_class is not None:
+            bindings.append(Binding(index, path, None))
+
+        # Subtrees on paths registered with `memoize` are executed once
+        # per request for each distinct set of args, fields and children.
+        # Those on paths with a `cache` are executed once per cache entry.
+        memo = None
+        effective_path = pending.effective_path
+        if (effective_path.memoize or effective_path.cache is not None) \
+                and index != 0 and not path.batch:
+            memo = effective_path
+
+        return Frame(label, index, path, pending.state,
+                     tuple(pending.children), batches, tuple(steps), memo)
+
+    @classmethod
+    def _flatten(cls, top:Frame):
+        # Frames are flattened in post-order from an explicit stack; the
+        # steps of each frame are kept until its parent has collected them.
+        flattened = {}
+        stack = [(top, False)]
+        while stack:
+            frame, is_expanded = stack.pop()
+            if not is_expanded:
+                stack.append((frame, True))
+                stack.extend((child, False) for child in frame.children)
+                continue
+            steps = []
+            if frame.state is not None:
+                steps.append(frame.state)
+            for child in frame.children:
+                steps.extend(flattened.pop(child.node))
+            steps.extend(frame.batches)
+            if frame.batches:
+                steps.append(Step(OP_ORDER, frame.label, frame.node,
+                                  frame.path, False, None, cls.labels(frame)))
+            steps.extend(frame.steps)
+            if frame.memo is not None:
+                redirected = frame.memo is not frame.path
+                lookup = Step(OP_LOOKUP, frame.label, frame.node, frame.memo,
+                              redirected, None, len(steps) + 1)
+                store = Step(OP_STORE, frame.label, frame.node, frame.memo,
+                             redirected, None)
+                steps = [lookup] + steps + [store]
+            flattened[frame.node] = steps
+        return flattened[top.node]
+
+    def top_level_steps(self):
+        """ The steps of each top-level node's subtree, by label, without
+            the batches of top-level nodes. See `Execution.run_isolated`.
+        """
+        if self._top_level_steps is None:
+            self._top_level_steps = tuple(
+                (child.label, tuple(self._flatten(child)))
+                for child in self.frame.children
+            )
+        return self._top_level_steps
+
+    @staticmethod
+    def labels(frame:Frame):
+        return tuple(child.label for child in frame.children)
+
+    def execute(self, request, nodes:list, stats:dict=None,
+                hooks:Hooks=None):
+        """ Run the plan against a fresh list of nodes, as returned by
+            `Node.flatten` for a clone of the template it was compiled from.
+        """
+        return Execution(self, request, nodes, stats, hooks).run()
+
+    def execute_concurrent(self, request, nodes:list, executor,
+                           stats:dict=None, hooks:Hooks=None):
+        """ Like `execute`, but sibling child frames are submitted to
+            `executor` (e.g. a `concurrent.futures.ThreadPoolExecutor`) and
+            joined before their parent's steps run.
+        """
+        execution = Execution(self, request, nodes, stats, hooks)
+        return execution.run_concurrent(executor)
+
+    def execute_isolated(self, request, nodes:list, group,
+                         stats:dict=None, hooks:Hooks=None):
+        """ Like `execute`, but errors are isolated to the group of
+            top-level nodes they were raised in. Returns the root result and
+            a dict of exceptions by group. See `Execution.run_isolated`.
+        """
+        execution = Execution(self, request, nodes, stats, hooks)
+        return execution.run_isolated(group)
+
+    async def execute_async(self, request, nodes:list, stats:dict=None,
+                            hooks:Hooks=None):
+        """ Asynchronous counterpart of `execute`. Each frame generates its
+            state before its children run, runs sibling child frames
+            concurrently with `asyncio.gather` and executes its own steps
+            once they have all finished.
+        """
+        return await Execution(self, request, nodes, stats, hooks).run_async()
+
+
+class _PendingFrame(object):
+    """
+    A frame whose children are still being compiled. See `Plan.compile`.
+    """
+    __slots__ = ('label', 'index', 'path', 'state', 'redirect_paths',
+                 'effective_path', 'children', 'batches')
+
+    def __init__(self, label, index, path, state, redirect_paths):
+        self.label = label
+        self.index = index
+        self.path = path
+        self.state = state
+        self.redirect_paths = redirect_paths
+        self.effective_path = redirect_paths[-1] if redirect_paths else path
+        self.children = []
+        self.batches = {}
+
+    def add_child(self, child:Frame):
+        # Siblings on the same batch path are collected into a single
+        # OP_BATCH step, which runs after all sibling subtrees have.
+        if child.path.batch and not child.path.has_redirect:
+            self.batches.setdefault(child.path, []).append(
+                (child.label, child.node))
+            child = child._replace(steps=())
+        self.children.append(child)
+
+
+class Execution(object):
+    """
+    Per-request state of a running `Plan`: the request, its nodes, the node
+    copies made for redirect paths, the memoized subtree results and the
+    authorized Contexts shared by nodes. If a `stats` dict is given, the
+    number of Contexts reused and created is stored in it. If `hooks` are
+    given, each phase of each node is traced; see `pygql.tracing`.
+    """
+
+    def __init__(self, plan:Plan, request, nodes:list, stats:dict=None,
+                 hooks:Hooks=None):
+        self.plan = plan
+        self.request = request
+        self.nodes = nodes
+        self.copies = [None] * plan.copies
+        self.memo = {}
+        self._memo_keys = {}
+        self.contexts = {}
+        self.stats = stats
+        self.hooks = hooks
+        if hooks is not None:
+            self.run_step = self._run_step_traced
+            self.run_step_async = self._run_step_async_traced
+
+        # indexes of nodes whose results were merged since the last event
+        # was emitted, and labels of flushed top-level results. See `iterate`.
+        self.completed = None
+        self.flushed = set()
+
+    def bind(self, on_error=None):
+        """ Instantiate the Context of each node, authorize and validate it.
+            If `on_error` is given, exceptions are passed to it along with
+            the index of the node instead of being raised.
+        """
+        trace = self.hooks.trace if self.hooks is not None else None
+        hits = misses = 0
+        for binding in self.plan.bindings:
+            if on_error is None:
+                is_hit = self._bind(binding, trace)
+            else:
+                try:
+                    is_hit = self._bind(binding, trace)
+                except Exception as exc:
+                    on_error(binding.node, exc)
+                    continue
+            if is_hit is not None:
+                if is_hit:
+                    hits += 1
+                else:
+                    misses += 1
+        if self.stats is not None:
+            self.stats['context_hits'] = hits
+            self.stats['context_misses'] = misses
+
+    def _bind(self, binding:Binding, trace):
+        # Returns whether a cached Context was reused, or None if the node
+        # has no cacheable Context.
+        request = self.request
+        node = self.nodes[binding.node]
+        if binding.copy is not None:
+            node = node.copy()
+            self.copies[binding.copy] = node
+        context_class = binding.path.context_class
+        if context_class is None:
+            return None
+        if isinstance(context_class, LazyRef):
+            # key the cache on the class itself, as later bindings will
+            context_class = context_class.resolve()
+        path = binding.path
+        is_hit = None
+        key = context_class.cache_key(request, node)
+        if key is None:
+            node.context, node.schema = self._authorize(node, path, trace)
+        else:
+            key = (context_class, key)
+            entry = self.contexts.get(key)
+            is_hit = entry is not None
+            if entry is None:
+                entry = self._authorize(node, path, trace)
+                self.contexts[key] = entry
+            node.context, node.schema = entry
+        if trace is None:
+            node._validate(request, path)
+        else:
+            trace(PHASE_VALIDATE, path, node.alias or node.name,
+                  node._validate, request, path)
+        return is_hit
+
+    def _authorize(self, node, path:Path, trace):
+        request = self.request
+        if trace is None:
+            context = path.context_class(request, node)
+            return context, context.authorize(request, node)
+        alias = node.alias or node.name
+        context = trace(PHASE_CONTEXT, path, alias,
+                        path.context_class, request, node)
+        schema = trace(PHASE_AUTHORIZE, path, alias,
+                       context.authorize, request, node)
+        return context, schema
+
+    def run(self):
+        self.bind()
+        self._run_steps(self.plan.steps)
+        return self.nodes[0].result
+
+    def _run_steps(self, steps:tuple):
+        i, n = 0, len(steps)
+        while i < n:
+            step = steps[i]
+            i += 1
+            if step.op == OP_LOOKUP:
+                if self.lookup(step):
+                    i += step.members
+            else:
+                self.run_step(step)
+
+    def run_isolated(self, group):
+        """ Run the plan like `run`, isolating errors by top-level node.
+            `group(label)` maps the label of each top-level node to a key,
+            such as the query it came from in `Node.execute_queries`. Once a
+            node of a group raises, the rest of the group is skipped and
+            other groups run as usual. Returns the root result and a dict of
+            the first exception raised in each failed group.
+        """
+        plan = self.plan
+        errors = {}
+
+        def fail(label, exc):
+            errors.setdefault(group(label), exc)
+
+        self.bind(lambda index, exc: fail(plan.response_paths[index][0], exc))
+        for label, steps in plan.top_level_steps():
+            if group(label) in errors:
+                continue
+            try:
+                self._run_steps(steps)
+            except Exception as exc:
+                fail(label, exc)
+
+        # batches of top-level nodes, which may span groups
+        root = plan.frame
+        for step in root.batches:
+            members = tuple(
+                member for member in step.members
+                if group(member[0]) not in errors
+            )
+            if not members:
+                continue
+            try:
+                self.run_step(step._replace(members=members))
+            except Exception as exc:
+                for label, _ in members:
+                    fail(label, exc)
+        if root.batches:
+            self.restore_order(self.nodes[0], Plan.labels(root))
+        return self.nodes[0].result, errors
+
+    def iterate(self, depth:int=None):
+        """ Run the plan, yielding `(response_path, result)` as the result
+            of each node is merged into its parent, where `response_path` is
+            the tuple of labels leading to it. Events deeper than `depth`
+            are not emitted. Top-level results are dropped from the root
+            result once they have been emitted, and the results of their
+            subtree's nodes once any OP_STORE step for them has run.
+        """
+        self.bind()
+        self.completed = []
+        root_result = self.nodes[0].result
+        response_paths = self.plan.response_paths
+        steps = self.plan.steps
+        flushed = []
+        i, n = 0, len(steps)
+        while i < n:
+            step = steps[i]
+            i += 1
+            if step.op == OP_LOOKUP:
+                if self.lookup(step):
+                    i += step.members
+            else:
+                self.run_step(step)
+            if self.completed:
+                for index in self.completed:
+                    response_path = response_paths[index]
+                    if depth is None or len(response_path) <= depth:
+                        yield response_path, self.nodes[index].result
+                    if len(response_path) == 1:
+                        root_result.pop(response_path[0], None)
+                        self.flushed.add(response_path[0])
+                        flushed.append(index)
+                del self.completed[:]
+            if flushed:
+                # the next step may store the result of the last one
+                keep = None
+                if i < n and steps[i].op == OP_STORE:
+                    keep = steps[i].node
+                for index in flushed:
+                    if index != keep:
+                        self.release(index)
+                flushed = [keep] if keep in flushed else []
+
+    def release(self, index:int):
+        """ Drop the results and state of the subtree rooted at a node, once
+            they are no longer needed. See `iterate`.
+        """
+        for node in self.nodes[index].flatten():
+            node._result = None
+            node._state = None
+            node._generator = None
+
+    def run_step(self, step:Step):
+        request = self.request
+        if step.op == OP_ORDER:
+            self.restore_order(self.nodes[step.node], step.members)
+            return
+
+        if step.op == OP_STORE:
+            self.store(step)
+            return
+
+        if step.op == OP_BATCH:
+            batch = [self.nodes[i] for _, i in step.members]
+            results = execute_batch(request, step.path, batch)
+            self._process_batch(step, batch, results)
+            return
+
+        node = self._node(step)
+
+        # Generate node.state for consumption by child nodes
+        if step.op == OP_STATE:
+            node._generate_state(request, step.path)
+            return
+
+        # call node.execute
+        result = node._execute_node(request, step.path, step.ignore)
+
+        # translate the result and store in parent
+        if not (result is None or step.ignore):
+            self.merge(step.node, node, result, step.label, step.path)
+
+    def _run_step_traced(self, step:Step):
+        # `run_step` with each phase wrapped in a `pygql.tracing.Span`
+        if step.op not in (OP_STATE, OP_EXECUTE, OP_BATCH):
+            return Execution.run_step(self, step)
+        request, path, trace = self.request, step.path, self.hooks.trace
+
+        if step.op == OP_BATCH:
+            batch = [self.nodes[i] for _, i in step.members]
+            results = trace(PHASE_EXECUTE, path, None,
+                            execute_batch, request, path, batch)
+            trace(PHASE_RESULT, path, None,
+                  self._process_batch, step, batch, results)
+            return
+
+        node = self._node(step)
+        if step.op == OP_STATE:
+            trace(PHASE_STATE, path, step.label,
+                  node._generate_state, request, path)
+            return
+
+        result = trace(PHASE_EXECUTE, path, step.label,
+                       node._execute_node, request, path, step.ignore)
+        if not (result is None or step.ignore):
+            trace(PHASE_RESULT, path, step.label, self.merge,
+                  step.node, node, result, step.label, path)
+
+    def merge(self, index:int, node, result, label:str, path:Path):
+        node._process_result(result, label, path)
+        joins = self.plan.joins.get(index)
+        if joins is not None:
+            for child_label, child_index, child_path in joins:
+                node._join(child_label, self.nodes[child_index], child_path)
+            node._drop_join_keys(joins)
+        if self.completed is not None:
+            self.completed.append(index)
+
+    def _node(self, step:Step):
+        if step.copy is None:
+            return self.nodes[step.node]
+        return self.copies[step.copy]
+
+    def _process_batch(self, step:Step, batch:list, results:list):
+        for (label, index), node, result in zip(step.members, batch, results):
+            if result is not None:
+                self.merge(index, node, result, label, step.path)
+
+    def lookup(self, step:Step):
+        """ Reuse the result of an identical subtree, memoized earlier in
+            this request or held in the path's cross-request cache. Returns
+            True on a hit. Each hit receives its own copy of the result, so
+            that it can be changed by the parent without affecting others.
+        """
+        path = step.path
+        node = self.nodes[step.node]
+        try:
+            key = cache_key(self.request, path, node, step.ignore)
+            hash(key)
+        except TypeError:
+            return False  # unhashable args; execute as usual
+        self._memo_keys[step.node] = key
+        entry = self.memo.get(key) if path.memoize else None
+        if entry is None and path.cache is not None:
+            entry = path.cache.get(key)
+        if entry is None:
+            return False
+        result, is_merged = entry
+        node.result = result = copy.deepcopy(result)
+        if is_merged and node.parent is not None:
+            node.parent.result[step.label] = result
+            if self.completed is not None:
+                self.completed.append(step.node)
+        return True
+
+    def store(self, step:Step):
+        # A copy is stored, since the node's result may still be changed by
+        # its parent, e.g. through `join_on`.
+        key = self._memo_keys.pop(step.node, None)
+        if key is not None:
+            path = step.path
+            node = self.nodes[step.node]
+            parent = node.parent
+            is_merged = parent is not None and (
+                step.label in parent.result or
+                (parent is self.nodes[0] and step.label in self.flushed))
+            entry = (copy.deepcopy(node.result), is_merged)
+            if path.memoize:
+                self.memo[key] = entry
+            if path.cache is not None:
+                path.cache.set(key, entry)
+
+    def run_concurrent(self, executor):
+        self.bind()
+        self._run_frame_concurrent(self.plan.frame, executor)
+        return self.nodes[0].result
+
+    def _run_frame_concurrent(self, frame:Frame, executor):
+        if frame.memo is not None and self.lookup(self._lookup_step(frame)):
+            return
+        if frame.state is not None:
+            self.run_step(frame.state)
+        children = frame.children
+        if len(children) > 1:
+            # Node results are created lazily, so create the one that the
+            # children merge into before they can race to create it.
+            self.nodes[frame.node].result
+            # the first child runs in this thread while its siblings are
+            # handed to the executor.
+            futures = [
+                executor.submit(self._run_frame_concurrent, child, executor)
+                for child in children[1:]
+            ]
+            try:
+                self._run_frame_concurrent(children[0], executor)
+                for child, future in zip(children[1:], futures):
+                    if future.cancel():
+                        # Not picked up by a worker yet. Run it here rather
+                        # than waiting, since every worker could be blocked
+                        # on a frame like this one.
+                        self._run_frame_concurrent(child, executor)
+                    else:
+                        future.result()
+            except:
+                for future in futures:
+                    future.cancel()
+                raise
+        elif children:
+            self._run_frame_concurrent(children[0], executor)
+        for step in frame.batches:
+            self.run_step(step)
+        if len(children) > 1:
+            self.restore_order(self.nodes[frame.node], Plan.labels(frame))
+        for step in frame.steps:
+            self.run_step(step)
+        if frame.memo is not None:
+            self.store(self._lookup_step(frame))
+
+    async def run_async(self):
+        self.bind()
+        await self._run_frame_async(self.plan.frame)
+        return self.nodes[0].result
+
+    async def _run_frame_async(self, frame:Frame):
+        if frame.memo is not None and self.lookup(self._lookup_step(frame)):
+            return
+        if frame.state is not None:
+            await self.run_step_async(frame.state)
+        if len(frame.children) > 1:
+            await asyncio.gather(*(
+                self._run_frame_async(child) for child in frame.children
+            ))
+        elif frame.children:
+            await self._run_frame_async(frame.children[0])
+        for step in frame.batches:
+            await self.run_step_async(step)
+        if len(frame.children) > 1:
+            self.restore_order(self.nodes[frame.node], Plan.labels(frame))
+        for step in frame.steps:
+            await self.run_step_async(step)
+        if frame.memo is not None:
+            self.store(self._lookup_step(frame))
+
+    async def run_step_async(self, step:Step):
+        request = self.request
+        if step.op == OP_BATCH:
+            batch = [self.nodes[i] for _, i in step.members]
+            results = await execute_batch_async(request, step.path, batch)
+            self._process_batch(step, batch, results)
+            return
+
+        if step.op not in (OP_STATE, OP_EXECUTE):
+            self.run_step(step)
+            return
+
+        node = self._node(step)
+
+        if step.op == OP_STATE:
+            await node._generate_state_async(request, step.path)
+            return
+
+        result = await node._execute_node_async(request, step.path, step.ignore)
+        if not (result is None or step.ignore):
+            self.merge(step.node, node, result, step.label, step.path)
+
+    async def _run_step_async_traced(self, step:Step):
+        if step.op not in (OP_STATE, OP_EXECUTE, OP_BATCH):
+            return self.run_step(step)
+        request, path, hooks = self.request, step.path, self.hooks
+
+        if step.op == OP_BATCH:
+            batch = [self.nodes[i] for _, i in step.members]
+            results = await hooks.trace_async(
+                PHASE_EXECUTE, path, None,
+                execute_batch_async, request, path, batch)
+            hooks.trace(PHASE_RESULT, path, None,
+                        self._process_batch, step, batch, results)
+            return
+
+        node = self._node(step)
+        if step.op == OP_STATE:
+            await hooks.trace_async(PHASE_STATE, path, step.label,
+                                    node._generate_state_async, request, path)
+            return
+
+        result = await hooks.trace_async(
+            PHASE_EXECUTE, path, step.label,
+            node._execute_node_async, request, path, step.ignore)
+        if not (result is None or step.ignore):
+            hooks.trace(PHASE_RESULT, path, step.label, self.merge,
+                        step.node, node, result, step.label, path)
+
+    @staticmethod
+    def _lookup_step(frame:Frame):
+        return Step(OP_LOOKUP, frame.label, frame.node, frame.memo,
+                    frame.memo is not frame.path, None)
+
+    @staticmethod
+    def restore_order(node, labels:tuple):
+        """ Child results are stored in the parent in order of completion,
+            which differs from query order when children run concurrently
+            or in batches. Reinsert them in query order so that results do
+            not depend on scheduling.
+        """
+        result = node.result
+        if isinstance(result, dict):
+            items = [
+                (label, result.pop(label))
+                for label in labels if label in result
+            ]
+            result.update(items)
@@ -12,26 +12,40 @@ class Field(object):
 
 
 class Schema(object):
+    """
+    Subclasses declare their fields as `Field` class attributes. The field
+    maps of each subclass are built once, when the class is created, and are
+    shared by all of its instances, so that a Schema is cheap to instantiate
+    for every node of every request.
+    """
+
     def __init__(self, default_role=None):
         self._default_role = default_role
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.inverse, cls.scalar, cls.nested = cls._build_fields()
+        cls._compiled = CompiledSchema(cls)
+
+    @classmethod
+    def _build_fields(cls):
         # inverse mapping from internal field names to public names
-        self.inverse = {}
+        inverse = {}
 
         # collections of data structures for fields corresponding to
         # scalar properties of the schema
-        self.scalar = SchemaFields()
+        scalar = SchemaFields()
 
         # same as above but for nested fields, i.e. relationships
-        self.nested = SchemaFields()
+        nested = SchemaFields()
 
-        # initialize self.scalar and self.nested
-        for k, v in self.__class__.__dict__.items():
+        # initialize scalar and nested
+        for k, v in cls.__dict__.items():
             if (not k.startswith('__')) and isinstance(v, Field):
                 if v.name is None:
                     v.name = k
-                self.inverse[v.name] = k
-                fields = self.nested if v.nested else self.scalar
+                inverse[v.name] = k
+                fields = nested if v.nested else scalar
                 fields.keys.add(k)
                 if v.roles:
                     for role in v.roles:
@@ -40,12 +54,14 @@ class Schema(object):
                     fields.public_field_map[k] = v.name
 
         # add public field maps to all authorized field maps
-        if self.scalar.public_field_map:
-            for role, field_map in self.scalar.authorized_field_maps.items():
-                field_map.update(self.scalar.public_field_map)
-        if self.nested.public_field_map:
-            for role, field_map in self.nested.authorized_field_maps.items():
-                field_map.update(self.nested.public_field_map)
+        if scalar.public_field_map:
+            for role, field_map in scalar.authorized_field_maps.items():
+                field_map.update(scalar.public_field_map)
+        if nested.public_field_map:
+            for role, field_map in nested.authorized_field_maps.items():
+                field_map.update(nested.public_field_map)
+
+        return inverse, scalar, nested
 
     def __contains__(self, key):
         return (key in self.scalar.keys) or (key in self.nested.keys)
@@ -54,29 +70,37 @@ class Schema(object):
         self._default_role = role
 
     def translate(self, keys:list, nested=False, role:str=None):
-        valid = []
-        unrecognized = []
         role = role if role else self._default_role
-        fields = self.nested if nested else self.scalar
-        if role is not None:
-            field_map = fields.authorized_field_maps[role]
-        else:
-            field_map = fields.public_field_map
-        for k_in in keys:
-            k_out = field_map.get(k_in)
-            if k_out is not None:
-                valid.append(k_out)
-            else:
-                unrecognized.append(k_in)
-        return (valid, unrecognized)
+        return self._compile().translator(role, nested)(keys)
+
+    def validate(self, keys, nested=False, role:str=None):
+        """ Like `translate`, also returning the duplicated names among the
+            translated keys. Results are cached for each Schema class, role
+            and list of keys, so that nodes selecting the same fields, such
+            as the spreads of a fragment, are only validated once.
+        """
+        role = role if role else self._default_role
+        return self._compile().validate(self, keys, nested, role)
 
     def keymap(self, keys:list):  # TODO: rename this somehow
         return {k: self.inverse[k] for k in keys}
 
     def dump(self, obj:dict):
-        return {
-            self.inverse[k]: v for k, v in obj.items()
-        }
+        return self._compile().dump(obj)
+
+    def dump_many(self, objs):
+        """ Dump each dict in an iterable of dicts, returning a list.
+        """
+        return self._compile().dump_many(objs)
+
+    def dump_columns(self, columns):
+        """ Dump a `pygql.columns.Columns` result by renaming its columns.
+        """
+        return columns.rename(self.inverse)
+
+    def _compile(self):
+        # compiled functions are shared by all instances of the class
+        return self._compiled
 
 
 class SchemaFields(object):
@@ -89,3 +113,93 @@ class SchemaFields(object):
 
         # all field names regardless of role
         self.keys = set()
+
+
+class CompiledSchema(object):
+    """
+    Dump and translate functions specialized for a Schema class. Translate
+    functions are built once per role, and dumps skip the key lookups for
+    rows whose keys need no renaming.
+    """
+
+    # bound on the number of cached validation results per class
+    MAX_VALIDATIONS = 4096
+
+    def __init__(self, schema):
+        self._translators = {}
+        self._validations = {}
+        self._field_maps = {
+            False: (schema.scalar.public_field_map,
+                    dict(schema.scalar.authorized_field_maps)),
+            True: (schema.nested.public_field_map,
+                   dict(schema.nested.authorized_field_maps)),
+        }
+        self.dump, self.dump_many = self._build_dump(schema.inverse)
+
+    def translator(self, role:str, nested:bool):
+        translate = self._translators.get((role, nested))
+        if translate is None:
+            public_field_map, authorized_field_maps = self._field_maps[nested]
+            if role is not None:
+                field_map = authorized_field_maps.get(role, {})
+            else:
+                field_map = public_field_map
+            translate = self._build_translator(field_map)
+            self._translators[(role, nested)] = translate
+        return translate
+
+    def validate(self, schema:Schema, keys, nested:bool, role:str):
+        if isinstance(keys, (set, frozenset)):
+            key = (role, nested, frozenset(keys))
+        else:
+            key = (role, nested, tuple(keys))
+        entry = self._validations.get(key)
+        if entry is None:
+            valid, unrecognized = schema.translate(keys, nested, role)
+            seen = set()
+            duplicates = []
+            for k in valid:
+                if k in seen and k not in duplicates:
+                    duplicates.append(k)
+                seen.add(k)
+            entry = (tuple(valid), tuple(unrecognized), tuple(duplicates))
+            if len(self._validations) >= self.MAX_VALIDATIONS:
+                self._validations.clear()
+            self._validations[key] = entry
+        # lists, since nodes keep and may extend their validated fields
+        return list(entry[0]), list(entry[1]), list(entry[2])
+
+    @staticmethod
+    def _build_translator(field_map:dict):
+        def translate(keys):
+            valid = [field_map[k] for k in keys if k in field_map]
+            if len(valid) == len(keys):
+                return (valid, [])
+            return (valid, [k for k in keys if k not in field_map])
+        return translate
+
+    @staticmethod
+    def _build_dump(inverse:dict):
+        # names that dump to themselves
+        unchanged = frozenset(k for k, v in inverse.items() if k == v)
+
+        def dump(obj):
+            if obj.keys() <= unchanged:
+                return dict(obj)
+            return {inverse[k]: v for k, v in obj.items()}
+
+        def dump_many(objs):
+            rows = []
+            append = rows.append
+            for obj in objs:
+                if obj.keys() <= unchanged:
+                    append(dict(obj))
+                else:
+                    append({inverse[k]: v for k, v in obj.items()})
+            return rows
+
+        return dump, dump_many
+
+
+Schema.inverse, Schema.scalar, Schema.nested = Schema._build_fields()
+Schema._compiled = CompiledSchema(Schema)
@@ -0,0 +1,30 @@
+import json
+
+from pygql.columns import json_default
+
+
+__all__ = ['write_json']
+
+
+def write_json(events, fp, encoder:json.JSONEncoder=None):
+    """
+    Write the top-level `(response_path, result)` events produced by
+    `graph.execute_iter(..., depth=1)` to the writable text stream `fp` as a
+    single JSON object. Each result is written as soon as it is received,
+    in the chunks generated by `encoder.iterencode`, so that neither the
+    response nor any nested value is held in memory as a serialized string.
+    Rows of `pygql.columns.Columns` results are materialized when written.
+    """
+    encoder = encoder or json.JSONEncoder(default=json_default)
+    fp.write('{')
+    separator = ''
+    for response_path, result in events:
+        if len(response_path) != 1:
+            continue
+        fp.write(separator)
+        fp.write(encoder.encode(response_path[0]))
+        fp.write(': ')
+        for chunk in encoder.iterencode(result):
+            fp.write(chunk)
+        separator = ', '
+    fp.write('}')
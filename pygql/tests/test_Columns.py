@@ -0,0 +1,48 @@
+import io
+import json
+
+from array import array
+
+import pytest
+
+from mock import MagicMock
+
+from pygql.columns import Columns, json_default
+
+
+def test_rows():
+    columns = Columns(id=['a', 'b'], score=array('i', [1, 2]))
+    columns['tags'] = [['x'], []]
+    assert len(columns) == 2
+    assert columns.to_list() == [
+        {'id': 'a', 'score': 1, 'tags': ['x']},
+        {'id': 'b', 'score': 2, 'tags': []},
+    ]
+    with pytest.raises(ValueError):
+        columns['bad'] = [1, 2, 3]
+
+
+def test_rename_and_nesting():
+    columns = Columns(public_id=['a']).rename({'public_id': 'id'})
+    columns['location'] = Columns(lat=[1.5])
+    assert json.loads(json.dumps(columns, default=json_default)) == [
+        {'id': 'a', 'location': {'lat': 1.5}}
+    ]
+
+
+def test_columnar_paths():
+    from pygql.examples.columnar import graph, paths
+
+    graph.scan(paths)
+    query = '{ user { name, photos { id, location { lat } } } }'
+    photos = graph.execute(MagicMock(), query)['user']['photos']
+    assert isinstance(photos, Columns)
+    assert photos.to_list()[0] == {
+        'id': 'id1',
+        'url': 'http://example.com/id1.jpg',
+        'location': {'lng': 130.0, 'lat': -27.0},
+    }
+
+    fp = io.StringIO()
+    graph.execute_to(MagicMock(), query, fp)
+    assert json.loads(fp.getvalue())['user']['photos'][2]['id'] == 'id3'
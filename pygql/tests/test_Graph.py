@@ -0,0 +1,249 @@
+import asyncio
+import io
+import json
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock import MagicMock
+
+from pygql.exceptions import MissingVariable, NotFound, UnknownQuery
+from pygql.examples.basic import graph, paths
+
+
+@pytest.fixture(scope='module', autouse=True)
+def registry():
+    graph.scan(paths)
+
+
+def test_persisted_query():
+    query_id = graph.register_query('company', '{ company { name } }')
+    assert query_id == 'company'
+    graph.warmup()
+    result = graph.execute_persisted(MagicMock(), 'company', {'id': '1'})
+    assert result == {'company': {'name': 'Generic Company'}}
+
+
+def test_persisted_query_hash():
+    query_id = graph.register_query(None, '{ company { type } }')
+    assert len(query_id) == 64
+    result = graph.execute_persisted(MagicMock(), query_id)
+    assert result == {'company': {'type': 'LLC'}}
+
+
+def test_persisted_query_errors():
+    with pytest.raises(NotFound):
+        graph.register_query('bad', '{ planet { name } }')
+    with pytest.raises(UnknownQuery):
+        graph.execute_persisted(MagicMock(), 'bad')
+
+
+def test_execute_async():
+    from pygql.examples.concurrent import graph, paths
+
+    graph.scan(paths)
+    start = time.monotonic()
+    result = asyncio.run(graph.execute_async(MagicMock(), '''{
+        a: user(id: "1") { name, friends { location { city } } },
+        b: user(id: "2") { name },
+        company { name }
+    }'''))
+    elapsed = time.monotonic() - start
+
+    assert list(result) == ['a', 'b', 'company']
+    assert result['a']['friends'][1] == {
+        'id': 'f2', 'location': {'city': 'Alexandria'}
+    }
+    # the three levels of user.friends.location are sequential while
+    # the `b` alias runs alongside them.
+    assert elapsed < 4 * paths.LATENCY
+
+
+def test_execute_with_executor():
+    query = '''{
+        jim: user(id: "ABC123") { location {city, state}, first_name },
+        bob: user(id: "LSD123") { first_name },
+        company { name }
+    }'''
+    expected = graph.execute(MagicMock(), query)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        graph.executor = executor
+        try:
+            result = graph.execute(MagicMock(), query)
+        finally:
+            graph.executor = None
+    assert result == expected
+    assert list(result) == ['jim', 'bob', 'company']
+
+
+def test_execute_with_executor_keeps_all_results():
+    query = '{ ' + ', '.join(
+        'c{}: company {{ name }}'.format(i) for i in range(8)) + ' }'
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            graph.executor = executor
+            try:
+                for _ in range(500):
+                    assert len(graph.execute(MagicMock(), query)) == 8
+            finally:
+                graph.executor = None
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_execute_iter():
+    events = list(graph.execute_iter(MagicMock(), '''{
+        jim: user(id: "ABC123") { location {city}, first_name },
+        company { name }
+    }'''))
+    assert [path for path, _ in events] == [
+        ('jim', 'location'), ('jim',), ('company',)
+    ]
+    assert events[0][1] == {'city': 'New York'}
+    assert events[2][1] == {'name': 'Generic Company'}
+
+    events = list(graph.execute_iter(MagicMock(), '''{
+        jim: user(id: "ABC123") { location {city}, first_name }
+    }''', depth=1))
+    assert [path for path, _ in events] == [('jim',)]
+
+
+def test_execute_to():
+    query = '''{
+        jim: user(id: "ABC123") { location {city}, first_name },
+        company { name }
+    }'''
+    fp = io.StringIO()
+    graph.execute_to(MagicMock(), query, fp)
+    assert json.loads(fp.getvalue()) == graph.execute(MagicMock(), query)
+
+
+def test_join():
+    from pygql.examples.joins import graph, paths
+
+    graph.scan(paths)
+    result = graph.execute(MagicMock(), '''{
+        user { photos { id, place { name }, tags { tag } } }
+    }''')
+    photos = result['user']['photos']
+    assert [p['place']['name'] for p in photos] == ['Bern', 'Zurich', 'Bern']
+    assert [[t['tag'] for t in p['tags']] for p in photos] == [
+        ['eating', 'lunch'], [], ['thinking']
+    ]
+    # join keys that were not selected are left out
+    assert 'place_id' not in photos[0]
+    assert photos[0]['place'] == {'name': 'Bern'}
+    assert photos[0]['tags'][0] == {'tag': 'eating'}
+
+
+def test_execute_batch():
+    from pygql.examples.batching import graph, paths
+
+    graph.scan(paths)
+    del paths.QUERIES[:]
+    results = graph.execute_batch(MagicMock(), [
+        '{ user(id: "789") { name } }',
+        '{ planet { name } }',
+        '{ company { name }, user(id: "145") { id } }',
+        '{ user(',
+    ])
+    # one round-trip for the users of both queries
+    assert paths.QUERIES == [['789', '145']]
+    assert results[0] == {'user': {'name': 'Jim'}}
+    assert isinstance(results[1], NotFound)
+    assert results[2] == {'company': {'name': 'Generic Company'},
+                          'user': {'id': '145'}}
+    assert list(results[2]) == ['company', 'user']
+    assert isinstance(results[3], Exception)
+
+
+def test_execute_batch_errors():
+    from pygql.examples.batching import graph, paths
+
+    graph.scan(paths)
+    del paths.QUERIES[:]
+    results = graph.execute_batch(MagicMock(), [
+        '{ user(id: "789") { name } }',
+        '{ company { name } }',
+        '{ company { name }, user(id: "000") { name } }',
+    ])
+    # the batch call raises for both users and no query is executed again
+    assert paths.QUERIES == [['789', '000']]
+    assert isinstance(results[0], KeyError)
+    assert results[1] == {'company': {'name': 'Generic Company'}}
+    assert isinstance(results[2], KeyError)
+
+    del paths.QUERIES[:]
+    results = graph.execute_batch(MagicMock(), [
+        'query ($id: ID!) { user(id: $id) { name } }',
+        '{ user(id: "789") { name } }',
+    ])
+    assert paths.QUERIES == [['789']]
+    assert isinstance(results[0], MissingVariable)
+    assert results[1] == {'user': {'name': 'Jim'}}
+
+
+def test_execute_variables():
+    from pygql.examples.batching import graph, paths
+
+    graph.scan(paths)
+    query = 'query ($id: ID!) { user(id: $id) { name } }'
+    request = MagicMock()
+    result = graph.execute(request, query, variables={'id': '789'})
+    entry = graph.parse_cache.get(query)
+    plan = entry.compile(graph.root, graph.registry_version)
+    assert result == {'user': {'name': 'Jim'}}
+
+    # the parse and plan of the query are reused for other ids
+    result = graph.execute(request, query, variables={'id': '145'})
+    assert result == {'user': {'name': 'Bob'}}
+    assert graph.parse_cache.get(query) is entry
+    assert entry.compile(graph.root, graph.registry_version) is plan
+
+    with pytest.raises(MissingVariable):
+        graph.execute(request, query)
+
+
+def test_execute_batch_variables():
+    from pygql.examples.batching import graph, paths
+
+    graph.scan(paths)
+    del paths.QUERIES[:]
+    query = 'query ($id: ID) { user(id: $id) { name } }'
+    results = graph.execute_batch(
+        MagicMock(), [query, query], variables=[{'id': '789'}, {'id': '145'}]
+    )
+    assert paths.QUERIES == [['789', '145']]
+    assert results == [{'user': {'name': 'Jim'}}, {'user': {'name': 'Bob'}}]
+
+
+def test_execute_fragments():
+    query = '''{
+        a: user(id: "1") { ...UserFields },
+        b: user(id: "2") { ...UserFields }
+    }
+    fragment UserFields on User { first_name, location { city } }'''
+    result = graph.execute(MagicMock(), query)
+    assert result['a'] == result['b']
+    assert set(result['a']) == {'first_name', 'location'}
+
+
+def test_write_json():
+    from pygql.serialize import write_json
+
+    events = [
+        (('a',), {True: None, None: {'b': [1, {'c': None}]}}),
+        (('a', 'b'), {}),
+        (('d',), [{'e': 1.5}]),
+    ]
+    fp = io.StringIO()
+    write_json(events, fp)
+    assert json.loads(fp.getvalue()) == {
+        'a': {'true': None, 'null': {'b': [1, {'c': None}]}},
+        'd': [{'e': 1.5}],
+    }
@@ -0,0 +1,55 @@
+import pytest
+
+from pygql.cache import LRUCache, TTLCache
+
+
+@pytest.fixture(scope='function')
+def cache():
+    return LRUCache(maxsize=2)
+
+
+def test_get_and_set(cache):
+    assert cache.get('a') is None
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_eviction(cache):
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')      # 'b' is now least recently used
+    cache.set('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.evictions == 1
+    assert cache.stats['size'] == 2
+
+
+def test_disabled():
+    cache = LRUCache(maxsize=0)
+    cache.set('a', 1)
+    assert len(cache) == 0
+
+
+def test_ttl_expiry():
+    now = [0.0]
+    cache = TTLCache(maxsize=4, ttl=10, timer=lambda: now[0])
+    cache.set('a', 1)
+    now[0] = 9.9
+    assert cache.get('a') == 1
+    now[0] = 10
+    assert cache.get('a') is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_evict():
+    cache = LRUCache(maxsize=4)
+    cache.set(('x', 1), 1)
+    cache.set(('x', 2), 2)
+    cache.set(('y', 1), 3)
+    assert cache.evict(lambda key: key[0] == 'x') == 2
+    assert ('y', 1) in cache
@@ -1,6 +1,13 @@
+import time
+
 import pytest
 
-from pygql.node import Node
+from pygql.cache import LRUCache
+from pygql.exceptions import (
+    FieldAmbiguityError, InvalidFragment, QueryLimitExceeded,
+)
+from pygql.node import Limits, Node
+from pygql.variables import Variable, resolve_args
 
 @pytest.fixture(scope='function')
 def node_string():
@@ -59,3 +66,122 @@ def test_parse(node_string, node):
     assert actual_node['kitty'].alias == 'kitty'
     assert actual_node['kitty'].name == 'cat'
     assert set(actual_node['kitty'].fields) == {'color', 'name'}
+
+
+def test_parse_cache(node_string):
+    cache = LRUCache(maxsize=8)
+    first = Node.parse(node_string, cache=cache)
+    second = Node.parse(node_string, cache=cache)
+    assert cache.misses == 1
+    assert cache.hits == 1
+    assert first is not second
+    assert first['fish'] is not second['fish']
+    assert second['fish']['location'].parent is second['fish']
+    assert second['kitty'].args == {'id': '1001010'}
+
+
+def test_parse_limits():
+    deep = '{ a { b { c { d } } } }'
+    assert Node.parse(deep, limits=Limits(4, None, None))['a']['b']
+    with pytest.raises(QueryLimitExceeded):
+        Node.parse(deep, limits=Limits(3, None, None))
+
+    wide = '{ x: a { id }, y: a { id }, z: a { id } }'
+    assert len(Node.parse(wide, limits=Limits(None, 6, 3)).children) == 3
+    with pytest.raises(QueryLimitExceeded):
+        Node.parse(wide, limits=Limits(None, 5, None))
+    with pytest.raises(QueryLimitExceeded):
+        Node.parse(wide, limits=Limits(None, None, 2))
+
+
+def test_deep_query():
+    # deep enough to exceed the recursion limit if each level of the tree
+    # took several frames, within what the graphql-core parser accepts.
+    depth = 150
+    query = '{ ' + ' { '.join('n{}'.format(i) for i in range(depth)) \
+        + ' { id }' + ' }' * depth
+    node = Node.parse(query)
+    assert len(node.clone().flatten()) == depth + 1
+
+
+def test_parse_variables():
+    root = Node.parse('''query ($id: ID!, $first: Int = 10, $tag: String) {
+        user(id: $id, page: {first: $first, tags: ["a", $tag]}) { name }
+    }''')
+    args = root['user'].args
+    assert args['id'] == Variable('id', required=True)
+    assert args['page'] == {
+        'first': Variable('first', default='10'),
+        'tags': ['a', Variable('tag')],
+    }
+    assert resolve_args(args, {'id': '1'}) == {
+        'id': '1', 'page': {'first': '10', 'tags': ['a', None]},
+    }
+
+
+def test_clone_args():
+    template = Node.parse('{ user(page: {first: 1, tags: ["a"]}) { name } }')
+    page = template.clone()['user'].args['page']
+    page['first'] = 2
+    page['tags'].append('b')
+    assert template.clone()['user'].args['page'] == {
+        'first': '1', 'tags': ['a'],
+    }
+
+
+def test_parse_fragments():
+    root = Node.parse('''{
+        user { name, location { city }, ...UserFields, ... on User { name } },
+        other: user { ...UserFields }
+    }
+    fragment UserFields on User { id, name, location { city, ...Place } }
+    fragment Place on Location { lat }''')
+    user, other = root['user'], root['other']
+    assert user.fields == ['name', 'id']
+    assert user['location'].fields == ['city', 'lat']
+    assert other.fields == ['id', 'name']
+    assert other['location'].fields == ['city', 'lat']
+
+
+def test_parse_invalid_fragments():
+    with pytest.raises(InvalidFragment):
+        Node.parse('{ user { ...Missing } }')
+    with pytest.raises(InvalidFragment):
+        Node.parse('''{ user { ...A } }
+            fragment A on User { id, ...B }
+            fragment B on User { ...A }''')
+
+
+def test_parse_fragment_conflicts():
+    for query in (
+        '{ user { a: name, ...F } } fragment F on User { a: email }',
+        '{ user { p: photos(first: 1) { id }, ...F } }'
+        ' fragment F on User { p: photos(first: 2) { id } }',
+        '{ user { location, ...F } } fragment F on User { location { lat } }',
+    ):
+        with pytest.raises(FieldAmbiguityError):
+            Node.parse(query)
+
+    # merged selections keep document order and do not merge repeats
+    # within a selection set, which validation rejects
+    root = Node.parse('''{ user { location { lat }, ...F } }
+        fragment F on User { location { city, city } }''')
+    assert root['user']['location'].fields == ['lat', 'city', 'city']
+    root = Node.parse('''{ user { ...F, ...F, name } }
+        fragment F on User { name, location { city } }''')
+    assert root['user'].fields == ['name']
+    assert root['user']['location'].fields == ['city']
+
+
+def test_parse_fragment_limits():
+    # each fragment spreads the next one twice, doubling the selections
+    levels = 30
+    query = '{ user { ...F0 } }\n' + '\n'.join(
+        'fragment F{0} on User {{ ...F{1}, ...F{1} }}'.format(i, i + 1)
+        for i in range(levels)
+    ) + '\nfragment F{} on User {{ id }}'.format(levels)
+    start = time.monotonic()
+    with pytest.raises(QueryLimitExceeded) as info:
+        Node.parse(query, limits=Limits(10, 100, 10))
+    assert time.monotonic() - start < 1
+    assert '"max_nodes"' in str(info.value)
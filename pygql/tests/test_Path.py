@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from mock import MagicMock
+
+from pygql.exceptions import NotFound, RedirectCycle
+from pygql.node import Node
+from pygql.path import Path
+from pygql.plan import Plan
+from pygql.examples.basic import graph, paths
+
+
+@pytest.fixture(scope='module', autouse=True)
+def registry():
+    graph.scan(paths)
+
+
+def test_frozen_after_scan():
+    assert graph.root.frozen
+    assert graph.root['user.location'] is graph.root['user']['location']
+    assert graph.root.index['user.location'].name == 'user.location'
+
+
+def test_unknown_child_is_not_created():
+    size = len(graph.root.index)
+    for query in ('{ planet { name } }', '{ user(id: "1") { spaceship { name } } }'):
+        with pytest.raises(NotFound):
+            graph.execute(MagicMock(), query)
+    assert not graph.root.contains(['planet'])
+    assert not graph.root.contains(['user', 'ship'])
+    assert len(graph.root.index) == size
+
+
+def test_redirect_chain():
+    root = Path(name=Path.ROOT_NAME)
+    root.traverse('a', create=True).redirect = 'b'
+    root.traverse('b', create=True).redirect = 'c'
+    root.traverse('c', create=True)
+    root.freeze()
+    assert root['a'].redirects == (root['b'], root['c'])
+    assert root['c'].redirects is None
+
+    # registration is still possible once frozen
+    path = root.traverse('d.e', create=True)
+    with pytest.raises(NotFound):
+        root['d.e']
+    root.freeze()
+    assert root['d.e'] is path
+
+
+def test_redirect_cycle():
+    root = Path(name=Path.ROOT_NAME)
+    root.traverse('a', create=True).redirect = 'b'
+    root.traverse('b', create=True).redirect = 'a'
+    for name in ('a', 'b'):
+        root[name].execute = lambda request, node: None
+
+    # plans compiled before the tree is frozen follow the chain themselves
+    with pytest.raises(RedirectCycle):
+        Plan.compile(Node.parse('{ a { id } }'), root)
+    with pytest.raises(RedirectCycle) as info:
+        root.freeze()
+    assert json.loads(str(info.value))['data']['paths'] in (
+        ['a', 'b', 'a'], ['b', 'a', 'b'])
+
+
+def test_intermediate_paths():
+    root = Path(name=Path.ROOT_NAME)
+    path = root.traverse('user.company.address', create=True)
+    root.children['place'].children['photo']
+    root.freeze()
+    assert root['user'].name == 'user'
+    assert root['user.company']['address'] is path
+    assert root['place.photo'].name == 'place.photo'
+    with pytest.raises(NotFound) as info:
+        root['user'].child('manager')
+    assert json.loads(str(info.value))['data']['path'] == 'user.manager'
@@ -0,0 +1,202 @@
+import sys
+import tracemalloc
+
+import pytest
+
+from mock import MagicMock
+
+from pygql import Graph
+from pygql.cache import TTLCache
+from pygql.node import Node
+from pygql.plan import Plan, OP_STATE, OP_EXECUTE
+from pygql.examples.basic import graph, paths
+
+
+@pytest.fixture(scope='module', autouse=True)
+def registry():
+    graph.scan(paths)
+
+
+@pytest.fixture(scope='function')
+def query():
+    return '''{
+        jim: user(id: "ABC123") { location {city, state}, first_name },
+        company { name }
+    }'''
+
+
+def test_compile(query):
+    plan = Plan.compile(Node.parse(query), graph.root)
+    ops = [(step.op, step.label) for step in plan.steps]
+    assert ops == [
+        (OP_STATE, 'jim'),
+        (OP_EXECUTE, 'location'),
+        (OP_EXECUTE, 'jim'),
+        (OP_EXECUTE, 'company'),
+    ]
+    assert [b.path.name for b in plan.bindings] == ['user.location', 'user']
+
+
+def test_plan_is_cached(query):
+    graph.execute(MagicMock(), query)
+    entry = graph.parse_cache.get(query)
+    plan = entry.compile(graph.root, graph.registry_version)
+    assert entry.compile(graph.root, graph.registry_version) is plan
+
+    graph.scan(paths)
+    assert entry.compile(graph.root, graph.registry_version) is not plan
+
+
+def test_execute(query):
+    result = graph.execute(MagicMock(), query)
+    assert result['jim']['location'] == {'city': 'New York', 'state': 'NY'}
+    assert result['company'] == {'name': 'Generic Company'}
+
+
+def test_batch():
+    from pygql.examples.batching import graph, paths
+
+    graph.scan(paths)
+    del paths.QUERIES[:]
+    result = graph.execute(MagicMock(), '''{
+        jim: user(id: "789") { name },
+        company { name },
+        bob: user(id: "145") { id, name }
+    }''')
+    assert paths.QUERIES == [['789', '145']]
+    assert list(result) == ['jim', 'company', 'bob']
+    assert result['bob'] == {'id': '145', 'name': 'Bob'}
+
+
+memo_graph = Graph()
+memo_calls = []
+
+
+@memo_graph(path='location', memoize=True)
+def location(request, node):
+    memo_calls.append(node.args['id'])
+    return {'city': 'Paris'}
+
+
+@memo_graph(path='country', cache=TTLCache(maxsize=8, ttl=60),
+            cache_key=lambda request, node: request.role)
+def country(request, node):
+    memo_calls.append(node.args['code'])
+    return {'name': 'France'}
+
+
+@memo_graph(path='project')
+def project(request, node):
+    return {}
+
+
+@memo_graph(path='project.site', redirect='location')
+def project_site(request, node):
+    pass
+
+
+@memo_graph(path='project.origin', redirect='country')
+def project_origin(request, node):
+    pass
+
+
+def test_memoize():
+    memo_graph.scan(sys.modules[__name__])
+    del memo_calls[:]
+    result = memo_graph.execute(MagicMock(), '''{
+        a: location(id: "1") { city },
+        b: location(id: "1") { city },
+        c: location(id: "2") { city },
+        d: location(id: "1") { country }
+    }''')
+    assert memo_calls == ['1', '2', '1']
+    assert result['a'] == result['b'] == {'city': 'Paris'}
+    assert result['a'] is not result['b']
+    assert list(result) == ['a', 'b', 'c', 'd']
+
+
+def test_memoize_redirect():
+    memo_graph.scan(sys.modules[__name__])
+    direct = 'a: location(id: "1") { city }'
+    redirected = 'project { site(id: "1") { city } }'
+    # a redirected subtree is not merged into its parent, so it must not be
+    # reused for a direct one, whatever their order
+    for fields in ((redirected, direct), (direct, redirected)):
+        result = memo_graph.execute(MagicMock(), '{{ {}, {} }}'.format(*fields))
+        assert result['a'] == {'city': 'Paris'}
+
+
+def test_cache():
+    memo_graph.scan(sys.modules[__name__])
+    del memo_calls[:]
+    query = '{ country(code: "FR") { name } }'
+    request = MagicMock(role='staff')
+    for _ in range(3):
+        assert memo_graph.execute(request, query) == {
+            'country': {'name': 'France'}
+        }
+    assert memo_calls == ['FR']
+
+    # changes to a result do not reach the cache
+    memo_graph.execute(request, query)['country']['name'] = 'Gaul'
+    assert memo_graph.execute(request, query) == {
+        'country': {'name': 'France'}
+    }
+
+    memo_graph.execute(MagicMock(role='anonymous'), query)
+    assert memo_calls == ['FR', 'FR']
+
+    assert memo_graph.invalidate('country', {'code': 'FR'}) == 2
+    memo_graph.execute(request, query)
+    assert memo_calls == ['FR', 'FR', 'FR']
+
+
+def test_cache_redirect():
+    memo_graph.scan(sys.modules[__name__])
+    request = MagicMock(role='staff')
+    memo_graph.execute(request, '{ project { origin(code: "CH") { name } } }')
+    # the redirected subtree cached above is not reused by later requests
+    assert memo_graph.execute(request, '{ country(code: "CH") { name } }') \
+        == {'country': {'name': 'France'}}
+
+
+def test_context_cache():
+    stats = {}
+    result = graph.execute(MagicMock(), '''{
+        a: user(id: "1") { location { city } },
+        b: user(id: "2") { location { city } },
+        c: user(id: "3") { location { state } }
+    }''', stats=stats)
+    # locations share one Context per request; users declare no cache key
+    assert stats == {'context_hits': 2, 'context_misses': 1}
+    assert result['a']['location'] is not result['b']['location']
+
+
+iter_graph = Graph()
+
+
+@iter_graph(path='page')
+def page(request, node):
+    return {'rows': [{'id': str(i)} for i in range(10000)]}
+
+
+@iter_graph(path='page.meta')
+def page_meta(request, node):
+    return {'tags': [str(i) for i in range(10000)]}
+
+
+def test_iterate_releases_results():
+    iter_graph.scan(sys.modules[__name__])
+    query = '{ ' + ', '.join(
+        'p{}: page {{ rows, meta {{ tags }} }}'.format(i) for i in range(10)
+    ) + ' }'
+    sizes = []
+    tracemalloc.start()
+    try:
+        for _, result in iter_graph.execute_iter(MagicMock(), query, depth=1):
+            sizes.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    # only the result being emitted is held in memory
+    assert len(sizes) == 10
+    assert max(sizes) < 2 * sizes[0]
@@ -86,3 +86,31 @@ def test_dump(schema):
         'email': 'virgil@gmail.com',
         'age': 3000
     }
+
+
+def test_dump_many(schema):
+    rows = [{'name': 'Publius', 'age': 3000}, {'public_id': '1', 'age': 2}]
+    assert schema.dump_many(rows) == [
+        {'name': 'Publius', 'age': 3000},
+        {'id': '1', 'age': 2},
+    ]
+    assert schema.dump_many(rows)[0] is not rows[0]
+    with pytest.raises(KeyError):
+        schema.dump({'unknown': 1})
+
+
+def test_field_maps_are_shared(schema):
+    other = schema.__class__(default_role='staff')
+    assert other.inverse is schema.inverse
+    assert other.scalar is schema.scalar
+    assert other.translate(['email'])[0] == ['email']
+    assert schema.translate(['email'])[1] == ['email']
+
+
+def test_validate(schema):
+    fields = ['id', 'name', 'id', 'planet']
+    assert schema.validate(fields, role='staff') == (
+        ['public_id', 'name', 'public_id'], ['planet'], ['public_id'])
+    schema.translate = None  # cached results are not translated again
+    valid, _, _ = schema.validate(fields, role='staff')
+    assert valid == ['public_id', 'name', 'public_id']
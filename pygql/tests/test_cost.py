@@ -0,0 +1,106 @@
+import json
+import sys
+
+import pytest
+
+from mock import MagicMock
+
+from pygql import Graph
+from pygql.cost import TokenBucket
+from pygql.exceptions import QueryCostExceeded, RateLimited
+
+
+graph = Graph()
+calls = []
+
+
+@graph('users', cost=2, fanout=lambda node: int(node.args.get('first', 10)))
+def users(request, node):
+    calls.append('users')
+    return {'name': 'a'}
+
+
+@graph('users.friends', cost=3)
+def friends(request, node):
+    calls.append('friends')
+    return {'name': 'b'}
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    graph.scan(sys.modules[__name__])
+    monkeypatch.setattr(graph, 'max_cost', None)
+    monkeypatch.setattr(graph, 'limiter', None)
+    del calls[:]
+
+
+def test_cost_exceeded(monkeypatch):
+    monkeypatch.setattr(graph, 'max_cost', 30)
+    with pytest.raises(QueryCostExceeded) as info:
+        graph.execute(MagicMock(), '{ users { friends { name } } }')
+    # users costs 2 plus 10 expected rows of friends at 3 each
+    assert json.loads(str(info.value))['data'] == {'cost': 32, 'budget': 30}
+    assert calls == []
+
+
+def test_cost_within_budget(monkeypatch):
+    monkeypatch.setattr(graph, 'max_cost', 30)
+    result = graph.execute(
+        MagicMock(), '{ users(first: 2) { friends { name } } }'
+    )
+    assert result['users']['friends'] == {'name': 'b'}
+    assert calls == ['friends', 'users']
+
+
+def test_rate_limited(monkeypatch):
+    clock = Clock()
+    limiter = TokenBucket(rate=1, capacity=10, timer=clock)
+    monkeypatch.setattr(graph, 'limiter', limiter)
+    query = '{ users(first: 1) { friends { name } } }'
+
+    for _ in range(2):
+        graph.execute(MagicMock(), query)
+    with pytest.raises(RateLimited):
+        graph.execute(MagicMock(), query)
+
+    clock.now += 5
+    graph.execute(MagicMock(), query)
+    assert calls == ['friends', 'users'] * 3
+
+
+def test_token_bucket_keys():
+    limiter = TokenBucket(rate=0, capacity=1, key=lambda request: request)
+    assert limiter.acquire('a')
+    assert not limiter.acquire('a')
+    assert limiter.acquire('b')
+
+
+def test_batch_cost(monkeypatch):
+    monkeypatch.setattr(graph, 'max_cost', 10)
+    query = '{ users(first: 1) { friends { name } } }'
+    expected = graph.execute(MagicMock(), query)
+    results = graph.execute_batch(MagicMock(), [
+        query, '{ users { friends { name } } }', query,
+    ])
+    # the budget applies to each query, not to their sum
+    assert results[0] == results[2] == expected
+    assert isinstance(results[1], QueryCostExceeded)
+
+    # the limiter is charged with the cost of the queries that were admitted
+    limiter = TokenBucket(rate=0, capacity=10, timer=Clock())
+    monkeypatch.setattr(graph, 'limiter', limiter)
+    results = graph.execute_batch(MagicMock(), [
+        query, '{ users { friends { name } } }', query,
+    ])
+    assert isinstance(results[1], QueryCostExceeded)
+    assert results[0] == results[2] == expected
+    results = graph.execute_batch(MagicMock(), [query])
+    assert isinstance(results[0], RateLimited)
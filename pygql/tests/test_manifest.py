@@ -0,0 +1,80 @@
+import pytest
+
+from mock import MagicMock
+
+from pygql import Graph
+from pygql.manifest import LazyRef, dump, main
+from pygql.examples.basic import graph, paths
+
+
+QUERY = '{ jim: user(id: "1") { location { city } }, company { name } }'
+
+
+@pytest.fixture(scope='module', autouse=True)
+def registry():
+    graph.scan(paths)
+
+
+def test_dump():
+    manifest = dump(graph)
+    assert manifest['paths']['user'] == {
+        'function': 'pygql.examples.basic.paths:user',
+        'context': 'pygql.examples.basic.paths:UserContext',
+        'yields': True,
+        'redirect': None,
+        'batch': False,
+        'memoize': False,
+        'join_on': None,
+        'join_many': False,
+        'cost': 1,
+        'fanout': 1,
+    }
+
+
+def test_load_manifest(tmpdir):
+    filename = str(tmpdir.join('manifest.json'))
+    main(['pygql.examples.basic:graph', 'pygql.examples.basic.paths',
+          '-o', filename])
+
+    loaded = Graph()
+    loaded.load_manifest(filename)
+    path = loaded.root['user']
+    assert isinstance(path.execute, LazyRef)
+    assert path.yields
+
+    result = loaded.execute(MagicMock(), QUERY)
+    assert result == graph.execute(MagicMock(), QUERY)
+    assert path.execute is paths.user
+    assert path.context_class is paths.UserContext
+
+
+def test_load_manifest_context_cache():
+    loaded = Graph()
+    loaded.load_manifest(dump(graph))
+    stats = {}
+    loaded.execute(MagicMock(), '''{
+        a: user(id: "1") { location { city } },
+        b: user(id: "2") { location { city } }
+    }''', stats=stats)
+    assert stats == {'context_hits': 1, 'context_misses': 1}
+
+
+def user_cost(node):
+    return 5
+
+
+def test_load_callable_options():
+    loaded = Graph()
+    loaded.load_manifest({'version': 1, 'paths': {'user': {
+        'function': 'pygql.examples.basic.paths:user',
+        'cost': {'ref': 'pygql.tests.test_manifest:user_cost'},
+    }}})
+    path = loaded.root['user']
+    assert isinstance(path.cost, LazyRef)
+    assert path.cost(None) == 5
+    assert not isinstance(path.cost, LazyRef)
+
+
+def test_unsupported_version():
+    with pytest.raises(ValueError):
+        Graph().load_manifest({'version': 0, 'paths': {}})
@@ -0,0 +1,68 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+from mock import MagicMock
+
+from pygql.tracing import ChromeTraceCollector, LatencyHistograms
+from pygql.examples.basic import graph, paths
+
+
+QUERY = '{ jim: user(id: "1") { location { city } }, company { name } }'
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    graph.scan(paths)
+    yield
+    graph.clear_hooks()
+
+
+def test_hooks():
+    started, ended = [], []
+    graph.on_node_start(started.append)
+    graph.on_node_end(ended.append)
+    result = graph.execute(MagicMock(), QUERY)
+
+    assert result['company'] == {'name': 'Generic Company'}
+    assert [s.phase for s in started] == [s.phase for s in ended]
+    spans = {(s.phase, s.path, s.alias): s for s in ended}
+    assert ('context', 'user', 'jim') in spans
+    assert ('authorize', 'user.location', 'location') in spans
+    assert ('validate', 'user', 'jim') in spans
+    assert ('state', 'user', 'jim') in spans
+    span = spans[('execute', 'company', 'company')]
+    assert span.size == len(result['company'])
+    assert span.duration >= 0
+
+
+def test_async_hooks():
+    ended = []
+    graph.on_node_end(ended.append)
+    asyncio.run(graph.execute_async(MagicMock(), QUERY))
+    assert ('execute', 'user') in {(s.phase, s.path) for s in ended}
+
+
+def test_collectors():
+    trace = graph.add_collector(ChromeTraceCollector())
+    histograms = graph.add_collector(LatencyHistograms())
+    for _ in range(3):
+        graph.execute(MagicMock(), QUERY)
+
+    fp = io.StringIO()
+    trace.write(fp)
+    events = json.loads(fp.getvalue())['traceEvents']
+    assert {e['ph'] for e in events} == {'X'}
+    assert {'user', 'user.location', 'company'} <= {e['name'] for e in events}
+
+    summary = histograms.summary()
+    assert set(summary) == {'user', 'user.location', 'company'}
+    assert summary['company']['count'] == 3
+    assert sum(count for _, count in summary['company']['buckets']) == 3
+
+
+def test_no_hooks():
+    assert graph.hooks is None
+    graph.execute(MagicMock(), QUERY)
@@ -0,0 +1,195 @@
+"""
+Instrumentation of query execution. Callbacks registered with
+`graph.on_node_start` and `graph.on_node_end` receive a `Span` for each phase
+of each node: Context instantiation, `authorize`, `_validate`, state
+generation, execution of the path function and processing of its result.
+Queries run without any tracing code when no callbacks are registered.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+from collections import defaultdict
+
+
+__all__ = ['Span', 'Hooks', 'ChromeTraceCollector', 'LatencyHistograms']
+
+
+PHASE_CONTEXT = 'context'
+PHASE_AUTHORIZE = 'authorize'
+PHASE_VALIDATE = 'validate'
+PHASE_STATE = 'state'
+PHASE_EXECUTE = 'execute'
+PHASE_RESULT = 'result'
+
+
+class Span(object):
+    """
+    One phase of one node, or of one batch of nodes. `start` and `end` are
+    `time.perf_counter()` values; they are None in `on_node_start`. `size`
+    is the length of the value returned by the phase, if it has one, and
+    `error` is the exception raised by the phase, if any.
+    """
+
+    __slots__ = (
+        'phase',
+        'path',
+        'alias',
+        'thread',
+        'start',
+        'end',
+        'size',
+        'error',
+    )
+
+    def __init__(self, phase:str, path:str, alias:str=None):
+        self.phase = phase
+        self.path = path
+        self.alias = alias
+        self.thread = threading.get_ident()
+        self.start = None
+        self.end = None
+        self.size = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return 'Span<{}:{}>'.format(self.phase, self.path)
+
+
+class Hooks(object):
+    """
+    The callbacks registered on a graph, called around each traced phase.
+    """
+
+    def __init__(self):
+        self.start = []
+        self.end = []
+
+    def trace(self, phase:str, path, alias:str, func, *args):
+        span = Span(phase, path.name, alias)
+        for callback in self.start:
+            callback(span)
+        span.start = time.perf_counter()
+        try:
+            result = func(*args)
+        except BaseException as exc:
+            span.error = exc
+            raise
+        else:
+            span.size = _size(result)
+            return result
+        finally:
+            span.end = time.perf_counter()
+            for callback in self.end:
+                callback(span)
+
+    async def trace_async(self, phase:str, path, alias:str, func, *args):
+        span = Span(phase, path.name, alias)
+        for callback in self.start:
+            callback(span)
+        span.start = time.perf_counter()
+        try:
+            result = await func(*args)
+        except BaseException as exc:
+            span.error = exc
+            raise
+        else:
+            span.size = _size(result)
+            return result
+        finally:
+            span.end = time.perf_counter()
+            for callback in self.end:
+                callback(span)
+
+
+def _size(result):
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+class ChromeTraceCollector(object):
+    """
+    Records spans as Chrome trace events, viewable in chrome://tracing or
+    Perfetto. Register it with `graph.add_collector(collector)`.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def on_node_end(self, span:Span):
+        args = {'size': span.size}
+        if span.alias is not None:
+            args['alias'] = span.alias
+        if span.error is not None:
+            args['error'] = repr(span.error)
+        self.events.append({
+            'name': span.path,
+            'cat': span.phase,
+            'ph': 'X',
+            'ts': (span.start - self._origin) * 1e6,
+            'dur': span.duration * 1e6,
+            'pid': self._pid,
+            'tid': span.thread,
+            'args': args,
+        })
+
+    def to_dict(self):
+        return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}
+
+    def write(self, fp):
+        """ Write the trace as JSON to the writable text stream `fp`.
+        """
+        json.dump(self.to_dict(), fp)
+
+
+class LatencyHistograms(object):
+    """
+    Per-path histograms of the time spent executing path functions, or in
+    the given `phases`. `bounds` are the upper bounds of the buckets, in
+    seconds; durations above the last bound are counted in a final bucket.
+    """
+
+    DEFAULT_BOUNDS = (
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+        0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+    )
+
+    def __init__(self, bounds:tuple=DEFAULT_BOUNDS, phases=(PHASE_EXECUTE, )):
+        self.bounds = tuple(bounds)
+        self.phases = frozenset(phases)
+        self._counts = defaultdict(lambda: [0] * (len(self.bounds) + 1))
+        self._totals = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def on_node_end(self, span:Span):
+        if span.phase not in self.phases:
+            return
+        duration = span.duration
+        bucket = bisect.bisect_left(self.bounds, duration)
+        with self._lock:
+            self._counts[span.path][bucket] += 1
+            self._totals[span.path] += duration
+
+    def summary(self):
+        """ Returns `{path: {'count', 'total', 'buckets'}}`, where `buckets`
+            lists `(upper bound, count)` pairs, the last bound being None.
+        """
+        with self._lock:
+            return {
+                path: {
+                    'count': sum(counts),
+                    'total': self._totals[path],
+                    'buckets': list(zip(self.bounds + (None, ), counts)),
+                }
+                for path, counts in self._counts.items()
+            }
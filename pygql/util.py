@@ -1,3 +1,6 @@
+__all__ = ['Projectable', 'freeze']
+
+
 class Projectable(object):
 
     @classmethod
@@ -6,3 +9,16 @@ class Projectable(object):
             return [getattr(cls, k) for k in keys]
         else:
             return {k: getattr(cls, k) for k in keys}
+
+
+def freeze(value):
+    """ Convert nested dicts, lists and sets into hashable tuples so that
+        they can be used in cache keys.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    return value
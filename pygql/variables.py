@@ -0,0 +1,131 @@
+"""
+GraphQL query variables. Argument values are converted from the AST when a
+query is parsed, with `$name` references kept as `Variable` objects in the
+args of the query template. They are replaced by the values passed to
+`graph.execute(..., variables=...)` in each request's copy of the template,
+so that queries differing only in their variables share one parse and plan.
+"""
+from graphql.language import ast
+
+from pygql.exceptions import MissingVariable
+
+
+__all__ = ['Variable', 'value_from_ast', 'has_variables', 'resolve_args']
+
+
+# default of variables declared without one
+NO_DEFAULT = object()
+
+
+class Variable(object):
+    """
+    Reference to the query variable `name` in an argument value. `default`
+    and `required` come from the variable's definition in the query, e.g.
+    `query ($id: ID!, $first: Int = 10)`.
+    """
+
+    __slots__ = ('name', 'default', 'required')
+
+    def __init__(self, name:str, default=NO_DEFAULT, required:bool=False):
+        self.name = name
+        self.default = default
+        self.required = required
+
+    def __eq__(self, other):
+        return isinstance(other, Variable) and (
+            (self.name, self.default, self.required) ==
+            (other.name, other.default, other.required))
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __repr__(self):
+        return 'Variable<${}>'.format(self.name)
+
+    def renamed(self, name:str):
+        return Variable(name, self.default, self.required)
+
+
+def value_from_ast(value, definitions:dict=None):
+    """
+    Convert an argument value from the graphql-core AST. Scalars keep the
+    literal value of the AST, lists and objects become lists and dicts, and
+    variable references become `Variable` objects, using the definitions
+    in `definitions` by name.
+    """
+    if isinstance(value, ast.Variable):
+        name = value.name.value
+        definition = (definitions or {}).get(name)
+        if definition is None:
+            return Variable(name)
+        default = NO_DEFAULT
+        if definition.default_value is not None:
+            default = value_from_ast(definition.default_value)
+        required = isinstance(definition.type, ast.NonNullType)
+        return Variable(name, default, required)
+    if isinstance(value, ast.ListValue):
+        return [value_from_ast(v, definitions) for v in value.values]
+    if isinstance(value, ast.ObjectValue):
+        return {
+            field.name.value: value_from_ast(field.value, definitions)
+            for field in value.fields
+        }
+    return value.value
+
+
+def has_variables(value):
+    if isinstance(value, Variable):
+        return True
+    if isinstance(value, dict):
+        return any(has_variables(v) for v in value.values())
+    if isinstance(value, list):
+        return any(has_variables(v) for v in value)
+    return False
+
+
+def resolve(value, variables:dict):
+    """
+    Replace the `Variable` objects in an argument value. Variables that
+    are neither given nor have a default resolve to None, unless they are
+    required, which raises `MissingVariable`.
+    """
+    if isinstance(value, Variable):
+        if value.name in variables:
+            return variables[value.name]
+        if value.default is not NO_DEFAULT:
+            return value.default
+        if value.required:
+            raise MissingVariable(value.name)
+        return None
+    if isinstance(value, dict):
+        return {k: resolve(v, variables) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, variables) for v in value]
+    return value
+
+
+def resolve_args(args:dict, variables:dict):
+    """
+    Resolve the variables in node args. Args whose value is a variable that
+    was neither given nor has a default are left out, as if the argument
+    had not been passed.
+    """
+    resolved = {}
+    for key, value in args.items():
+        if isinstance(value, Variable) and value.name not in variables \
+                and value.default is NO_DEFAULT and not value.required:
+            continue
+        resolved[key] = resolve(value, variables)
+    return resolved
+
+
+def rename(value, prefix:str):
+    """ Prefix the names of the variables in an argument value.
+    """
+    if isinstance(value, Variable):
+        return value.renamed(prefix + value.name)
+    if isinstance(value, dict):
+        return {k: rename(v, prefix) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rename(v, prefix) for v in value]
+    return value
@@ -21,4 +21,7 @@ setup(name='PyGQL',
       author_email='daniel.gabriele@axial.net',
       install_requires=REQUIREMENTS,
       url=None,
-      packages=find_packages())
+      packages=find_packages(),
+      entry_points={
+          'console_scripts': ['pygql-manifest=pygql.manifest:main'],
+      })